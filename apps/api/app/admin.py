@@ -0,0 +1,173 @@
+import argparse
+import asyncio
+import sys
+import time
+from sqlalchemy import select
+from app.config import env_flag
+from app.db import engine, SessionLocal
+from app.models import User, Category, Listing
+from app.auth import hash_password
+from app.migrations import MIGRATIONS, applied_versions, run_migrations
+from app.bulk_import import FORMATS, detect_format, import_listings, iter_file, iter_lines, iter_records
+
+# Operational entry point, run once per deploy rather than in every worker:
+#
+#     python -m app.admin migrate
+#     python -m app.admin seed
+#     python -m app.admin status
+#     python -m app.admin import-listings listings.csv --owner-id 1
+#     python -m app.admin run-jobs
+
+# Let `uvicorn app.main:app` migrate and seed on boot (local development only)
+DEV_AUTO_SEED = env_flag("DEV_AUTO_SEED", False)
+
+async def seed_demo_data():
+    """Insert the demo user, categories and listings unless already present."""
+    async with SessionLocal() as session:
+        # Check if data already exists
+        result = await session.execute(select(User).where(User.email == "john@example.com"))
+        if result.scalar_one_or_none():
+            print("Data already seeded, skipping...")
+            return
+        
+        # Seed demo user
+        demo_user = User(
+            email="john@example.com",
+            username="john",
+            password_hash=hash_password("secret")
+        )
+        session.add(demo_user)
+        await session.flush()  # Get user ID
+        
+        # Seed categories
+        categories_data = [
+            {"name": "Electronics", "slug": "electronics"},
+            {"name": "Furniture", "slug": "furniture"},
+            {"name": "Books", "slug": "books"},
+            {"name": "Fashion", "slug": "fashion"},
+            {"name": "Sports", "slug": "sports"},
+            {"name": "Home", "slug": "home"}
+        ]
+        
+        for cat_data in categories_data:
+            category = Category(**cat_data)
+            session.add(category)
+        
+        # Seed sample listings
+        listings_data = [
+            {
+                "title": "MacBook Air M2",
+                "description": "Excellent condition, barely used",
+                "category": "electronics",
+                "price": 45000.0,
+                "owner_id": demo_user.id
+            },
+            {
+                "title": "Wooden Dining Table",
+                "description": "Solid oak, seats 6 people",
+                "category": "furniture", 
+                "price": 12000.0,
+                "owner_id": demo_user.id
+            },
+            {
+                "title": "Programming Books Collection",
+                "description": "Python, JavaScript, and React books",
+                "category": "books",
+                "price": 2500.0,
+                "owner_id": demo_user.id
+            },
+            {
+                "title": "Vintage Leather Jacket",
+                "description": "Genuine leather, size M",
+                "category": "fashion",
+                "price": 8000.0,
+                "owner_id": demo_user.id
+            }
+        ]
+        
+        for listing_data in listings_data:
+            listing = Listing(**listing_data)
+            session.add(listing)
+        
+        await session.commit()
+        print("Database seeded successfully!")
+
+async def migrate():
+    """Apply pending migrations and list them."""
+    applied = await run_migrations(engine)
+    for migration in applied:
+        print(f"Applied migration {migration.version}: {migration.description}")
+    if not applied:
+        print("No pending migrations")
+
+async def migrate_and_seed():
+    """Apply migrations and seed initial data."""
+    await migrate()
+    await seed_demo_data()
+
+async def migration_status():
+    async with engine.connect() as conn:
+        done = set(await applied_versions(conn))
+        await conn.commit()
+    
+    for migration in MIGRATIONS:
+        state = "applied" if migration.version in done else "pending"
+        print(f"{migration.version:>4}  {state:<8} {migration.description}")
+
+async def legacy_init():
+    # The legacy single-file app (apps/api/main.py) keeps its own schema
+    from main import engine as legacy_engine, init_db
+    try:
+        await init_db()
+    finally:
+        await legacy_engine.dispose()
+
+async def run_due_jobs():
+    # Workers run jobs as they come; this drains a backlog by hand (e.g. after an outage)
+    from app.tasks import job_queue
+    print(f"Ran {await job_queue.drain()} jobs")
+
+async def import_listings_file(path: str, owner_id: int, fmt: str = None):
+    records = iter_records(iter_lines(iter_file(path)), fmt or detect_format(path))
+    report = await import_listings(engine, owner_id, records)
+    
+    for error in report.errors:
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    print(f"Imported {report.inserted} listings, {report.failed} rows failed")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="ecofinds-admin", description="EcoFinds database administration")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="apply pending migrations")
+    commands.add_parser("seed", help="migrate, then insert demo data")
+    commands.add_parser("status", help="list migrations and whether they are applied")
+    commands.add_parser("legacy-init", help="create and seed the legacy app's schema")
+    commands.add_parser("run-jobs", help="run every due background job once")
+    import_parser = commands.add_parser("import-listings", help="bulk import listings from CSV or JSONL")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--owner-id", type=int, required=True)
+    import_parser.add_argument("--format", choices=FORMATS, help="defaults from the file extension")
+    args = parser.parse_args(argv)
+    
+    commands = {
+        "migrate": migrate,
+        "seed": migrate_and_seed,
+        "status": migration_status,
+        "legacy-init": legacy_init,
+        "run-jobs": run_due_jobs,
+        "import-listings": lambda: import_listings_file(args.path, args.owner_id, args.format),
+    }
+    
+    async def run():
+        started = time.perf_counter()
+        try:
+            await commands[args.command]()
+        finally:
+            await engine.dispose()
+        print(f"{args.command} finished in {time.perf_counter() - started:.2f}s")
+    
+    asyncio.run(run())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,37 @@
 import os
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
+from app.cache import TTLCache
 from app.db import get_session
 from app.models import User
+from app.passwords import hash_password, verify_password, hash_password_async, verify_password_async
 
 # Settings from environment
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-change-me")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "120"))
 ALGORITHM = "HS256"
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# "db" re-checks the user row (through the principal cache); "stateless" trusts
+# the signed claims and never touches the database on authenticated requests.
+#
+# Revocation (revoke_user_tokens) bumps users.token_version. In db mode other
+# processes notice once their cached principal expires, so within
+# PRINCIPAL_CACHE_TTL seconds. In stateless mode only the process that revoked
+# rejects older tokens (_revoked_before lives in memory); everywhere else they
+# stay valid until they expire, so keep ACCESS_TOKEN_EXPIRE_MINUTES short there.
+AUTH_MODE = os.getenv("AUTH_MODE", "db")
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
 
 # HTTP Bearer token scheme
 security = HTTPBearer()
 
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -41,30 +44,111 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    session: AsyncSession = Depends(get_session)
-) -> User:
-    """Get the current authenticated user from JWT token."""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
+def token_claims(user: User) -> dict:
+    """Claims embedded in access tokens for a user."""
+    return {"sub": str(user.id), "username": user.username, "ver": user.token_version or 0}
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller: what routes need from the user row, immutable so it can be cached."""
+    id: int
+    username: str
+    token_version: int
+
+# user id -> Principal; TTL + LRU, so revocations elsewhere are seen within the TTL
+principal_cache = TTLCache(PRINCIPAL_CACHE_TTL, maxsize=max(0, PRINCIPAL_CACHE_SIZE))
+
+# user id -> lowest token version still accepted by this process
+_revoked_before: Dict[int, int] = {}
+
+def invalidate_user(user_id: int, token_version: Optional[int] = None):
+    """Drop a cached principal; with token_version, also reject older tokens."""
+    principal_cache.invalidate(user_id)
+    if token_version is not None:
+        _revoked_before[user_id] = max(token_version, _revoked_before.get(user_id, 0))
+
+async def revoke_user_tokens(session: AsyncSession, user_id: int):
+    """Invalidate every token issued to a user so far."""
+    # Incremented in SQL so concurrent revocations never lose a bump
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(token_version=User.token_version + 1)
+        .returning(User.token_version)
+        .execution_options(synchronize_session=False)
     )
-    
+    token_version = result.scalar_one()
+    await session.commit()
+    invalidate_user(user_id, token_version)
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+def decode_token(token: str) -> Tuple[int, int, dict]:
+    """Verify a JWT and return (user id, token version, claims)."""
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user_id = int(payload["sub"])
+        version = int(payload.get("ver", 0))
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise credentials_exception
+    
+    if version < _revoked_before.get(user_id, 0):
         raise credentials_exception
     
-    # Get user from database
-    result = await session.execute(select(User).where(User.id == int(user_id)))
+    return user_id, version, payload
+
+async def fetch_user(session: AsyncSession, user_id: int, version: int) -> User:
+    """Load the user row for a verified token, rejecting revoked tokens."""
+    result = await session.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
     
-    if user is None:
+    if user is None or (user.token_version or 0) != version:
         raise credentials_exception
     
-    return user
\ No newline at end of file
+    return user
+
+async def load_principal(session: AsyncSession, user_id: int, version: int) -> Principal:
+    """Return the principal for a verified token, from the principal cache when possible."""
+    principal = principal_cache.get(user_id)
+    
+    if principal is None:
+        result = await session.execute(
+            select(User.id, User.username, User.token_version).where(User.id == user_id)
+        )
+        row = result.first()
+        if row is None:
+            raise credentials_exception
+        principal = Principal(row.id, row.username, row.token_version or 0)
+        principal_cache.set(user_id, principal)
+    
+    if principal.token_version != version:
+        raise credentials_exception
+    
+    return principal
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    session: AsyncSession = Depends(get_session)
+) -> Principal:
+    """Get the current authenticated principal from JWT token.
+    
+    In stateless mode the principal is built from the token claims alone.
+    """
+    user_id, version, payload = decode_token(credentials.credentials)
+    
+    if AUTH_MODE == "stateless" and "username" in payload:
+        return Principal(user_id, payload["username"], version)
+    
+    return await load_principal(session, user_id, version)
+
+async def get_current_user_record(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    session: AsyncSession = Depends(get_session)
+) -> User:
+    """Get the full user row for the token, regardless of AUTH_MODE."""
+    user_id, version, _ = decode_token(credentials.credentials)
+    return await fetch_user(session, user_id, version)
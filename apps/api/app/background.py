@@ -0,0 +1,32 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+# Periodic maintenance loops (hold and idempotency-key sweepers, replica lag
+# checks), run as tasks created at startup and cancelled at shutdown.
+
+logger = logging.getLogger(__name__)
+
+async def run_periodically(
+    description: str,
+    interval: float,
+    step: Callable[[], Awaitable[Any]],
+    immediately: bool = False
+):
+    """Await step() every interval seconds until cancelled.
+
+    A failing step is logged and tried again next interval; a truthy result
+    (e.g. rows deleted) is logged at INFO. With immediately, the first step
+    runs before the first sleep.
+    """
+    if not immediately:
+        await asyncio.sleep(interval)
+    while True:
+        try:
+            result = await step()
+        except Exception:
+            logger.warning("%s failed", description, exc_info=True)
+        else:
+            if result:
+                logger.info("%s: %s", description, result)
+        await asyncio.sleep(interval)
@@ -0,0 +1,169 @@
+import codecs
+import csv
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator, List, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.models import Listing
+from app.schemas import ListingCreate
+
+# Streaming bulk import of listings from CSV or JSONL.
+#
+# Input is parsed line by line from an async byte stream, validated with
+# ListingCreate, and written in batches: COPY on asyncpg, a multi-row INSERT
+# elsewhere. Each batch commits on its own, so memory stays bounded by the
+# batch size and a bad row only costs that row.
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# Errors beyond this are counted but not itemized in the report
+MAX_REPORTED_ERRORS = 1000
+
+FORMATS = ("csv", "jsonl")
+
+_COLUMNS = ["title", "description", "category", "price", "owner_id", "created_at"]
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a UTF-8 byte stream into lines (line endings kept)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def iter_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Tuple[int, object]]:
+    """Yield (line number, raw record) pairs; unparsable lines yield the exception."""
+    header = None
+    buffered = ""
+    line_no = 0
+    start_line = 0
+
+    async for line in lines:
+        line_no += 1
+
+        if fmt == "jsonl":
+            if line.strip():
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as exc:
+                    yield line_no, exc
+            continue
+
+        # CSV: keep reading while a quoted field spans lines
+        if not buffered:
+            start_line = line_no
+        buffered += line
+        if buffered.count('"') % 2:
+            continue
+
+        text, buffered = buffered, ""
+        if not text.strip():
+            continue
+
+        row = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in row]
+            continue
+        yield start_line, dict(zip(header, row))
+
+    if buffered.strip():
+        yield start_line, ValueError("Unterminated quoted field")
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def error(self, line: int, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> dict:
+        return {"inserted": self.inserted, "failed": self.failed, "errors": self.errors}
+
+async def _write_batch(engine: AsyncEngine, rows: List[dict]) -> int:
+    """Insert one batch in its own transaction; returns the rows committed."""
+    async with engine.connect() as conn:
+        if conn.dialect.driver == "asyncpg":
+            raw = await conn.get_raw_connection()
+            driver = raw.driver_connection
+            # COPY goes around SQLAlchemy's transaction handling, so it gets an explicit one
+            async with driver.transaction():
+                await driver.copy_records_to_table(
+                    Listing.__tablename__,
+                    records=[tuple(row[column] for column in _COLUMNS) for row in rows],
+                    columns=_COLUMNS,
+                )
+        else:
+            await conn.execute(insert(Listing), rows)
+            await conn.commit()
+    return len(rows)
+
+async def import_listings(
+    engine: AsyncEngine,
+    owner_id: int,
+    records: AsyncIterator[Tuple[int, object]],
+    batch_size: int = IMPORT_BATCH_SIZE
+) -> ImportReport:
+    """Validate and insert listings for owner_id, batch by batch."""
+    report = ImportReport()
+    batch: List[dict] = []
+
+    async for line, record in records:
+        if isinstance(record, Exception):
+            report.error(line, str(record))
+            continue
+        if not isinstance(record, dict):
+            report.error(line, "Expected an object")
+            continue
+
+        # Empty CSV cells mean "not given"
+        record = {key: value for key, value in record.items() if key and value != ""}
+        try:
+            listing = ListingCreate.model_validate(record)
+        except ValidationError as exc:
+            report.error(line, [
+                {"field": ".".join(str(part) for part in error["loc"]), "message": error["msg"]}
+                for error in exc.errors()
+            ])
+            continue
+
+        batch.append({
+            "title": listing.title,
+            "description": listing.description,
+            "category": listing.category,
+            "price": listing.price,
+            "owner_id": owner_id,
+            "created_at": datetime.utcnow(),
+        })
+
+        if len(batch) >= batch_size:
+            report.inserted += await _write_batch(engine, batch)
+            batch = []
+
+    if batch:
+        report.inserted += await _write_batch(engine, batch)
+
+    return report
+
+async def iter_file(path: str, chunk_size: int = 1 << 16) -> AsyncIterator[bytes]:
+    """Read a local file in chunks (for the admin CLI)."""
+    with open(path, "rb") as handle:
+        while chunk := handle.read(chunk_size):
+            yield chunk
+
+def detect_format(hint: str) -> str:
+    """csv or jsonl from a content type or file name (jsonl by default)."""
+    hint = (hint or "").lower()
+    return "csv" if "csv" in hint else "jsonl"
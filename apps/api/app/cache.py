@@ -0,0 +1,92 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+from fastapi import Request, Response
+from app.serialization import dumps
+
+# In-process caching for near-static JSON endpoints.
+#
+# Entries hold the encoded body and its ETag so hits cost no database work and
+# no re-serialization. Invalidation is per process; the TTL bounds how stale
+# other workers can be.
+
+CATEGORY_CACHE_TTL = float(os.getenv("CATEGORY_CACHE_TTL", "300"))
+# Browser/CDN freshness; after that clients revalidate with If-None-Match
+CATEGORY_MAX_AGE = int(os.getenv("CATEGORY_MAX_AGE", "60"))
+
+class CachedResponse:
+    """An encoded JSON body plus its strong ETag."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+    @classmethod
+    def from_data(cls, data: Any) -> "CachedResponse":
+        return cls(dumps(data))
+
+class TTLCache:
+    """Dict-backed cache whose entries expire after ttl seconds.
+
+    With maxsize, the least recently used entries are evicted beyond it.
+    This is the one in-process TTL/LRU structure; other caches build on it.
+    """
+
+    def __init__(self, ttl: float, maxsize: Optional[int] = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> Any:
+        """Store value for ttl seconds (default self.ttl); a ttl <= 0 stores nothing."""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl > 0 and self.maxsize != 0:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one key, or everything when key is None."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+# /categories and listing-category counts
+category_cache = TTLCache(CATEGORY_CACHE_TTL)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match covers etag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def cached_json_response(request: Request, cached: CachedResponse, max_age: int) -> Response:
+    """Serve a cached body with ETag/Cache-Control, or 304 if the client has it."""
+    headers = {"ETag": cached.etag, "Cache-Control": f"public, max-age={max_age}"}
+
+    if etag_matches(request, cached.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=cached.body, media_type="application/json", headers=headers)
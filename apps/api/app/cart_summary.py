@@ -0,0 +1,66 @@
+from datetime import datetime
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import dialect_insert
+from app.models import CartItem, CartSummary
+
+# Materialized cart totals.
+#
+# Every write to cart_items applies the matching delta to the user's
+# cart_summaries row in the same transaction, so GET /cart/summary is a
+# primary-key lookup instead of a join and a sum. Bulk edits recompute the row
+# from cart_items instead. The migration backfilled existing carts and a user's
+# first cart write creates the row, so a missing row means an empty cart and
+# reads never write.
+
+def adjust_cart_summary(dialect: str, user_id: int, lines: int, items: int, amount: float):
+    """Upsert adding deltas to a user's summary (negative deltas for removals)."""
+    stmt = dialect_insert(dialect)(CartSummary).values(
+        user_id=user_id,
+        line_count=lines,
+        item_count=items,
+        subtotal=amount,
+        updated_at=datetime.utcnow()
+    )
+    line_count = CartSummary.line_count + stmt.excluded.line_count
+    return stmt.on_conflict_do_update(
+        index_elements=[CartSummary.user_id],
+        set_={
+            "line_count": line_count,
+            "item_count": CartSummary.item_count + stmt.excluded.item_count,
+            # An empty cart resets the float subtotal so rounding error cannot accumulate
+            "subtotal": case((line_count <= 0, 0.0), else_=CartSummary.subtotal + stmt.excluded.subtotal),
+            "updated_at": stmt.excluded.updated_at
+        }
+    )
+
+def refresh_cart_summary(dialect: str, user_id: int):
+    """Upsert recomputing a user's summary from cart_items (one aggregate statement)."""
+    totals = select(
+        literal(user_id),
+        func.count(CartItem.id),
+        func.coalesce(func.sum(CartItem.qty), 0),
+        func.coalesce(func.sum(CartItem.unit_price * CartItem.qty), 0.0),
+        literal(datetime.utcnow())
+    ).where(CartItem.user_id == user_id)
+    
+    stmt = dialect_insert(dialect)(CartSummary).from_select(
+        [CartSummary.user_id, CartSummary.line_count, CartSummary.item_count, CartSummary.subtotal, CartSummary.updated_at],
+        totals
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[CartSummary.user_id],
+        set_={
+            "line_count": stmt.excluded.line_count,
+            "item_count": stmt.excluded.item_count,
+            "subtotal": stmt.excluded.subtotal,
+            "updated_at": stmt.excluded.updated_at
+        }
+    )
+
+async def get_cart_summary(session: AsyncSession, user_id: int) -> CartSummary:
+    """Load a user's summary; users who never had a cart get an unsaved empty one."""
+    summary = await session.get(CartSummary, user_id)
+    if summary is None:
+        summary = CartSummary(user_id=user_id, line_count=0, item_count=0, subtotal=0.0)
+    return summary
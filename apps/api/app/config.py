@@ -0,0 +1,10 @@
+import os
+
+# Helpers for reading settings from the environment.
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """Boolean setting: 1, true or yes (any case) means on; unset means default."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes")
@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterable, List, Optional, Sequence
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+# Streaming exports.
+#
+# Rows come from a server-side cursor (session.stream with yield_per) and are
+# encoded one partition at a time, so memory use does not depend on how many
+# rows are exported.
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def _plain(value):
+    # Same timestamp format as the JSON API responses
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def ndjson_lines(records: Iterable[dict]) -> bytes:
+    return "".join(
+        json.dumps(record, default=lambda value: str(_plain(value)), separators=(",", ":")) + "\n"
+        for record in records
+    ).encode()
+
+def csv_lines(rows: Iterable[Sequence]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+async def stream_rows(
+    sessionmaker: async_sessionmaker,
+    stmt,
+    encode: Callable[[List], bytes],
+    header: Optional[bytes] = None,
+    finish: Optional[Callable[[], bytes]] = None
+) -> AsyncIterator[bytes]:
+    """Run stmt on a server-side cursor and yield each encoded partition.
+    
+    finish, if given, is called once after the last row for encoders that
+    hold state across partitions.
+    """
+    if header:
+        yield header
+
+    # The session lives as long as the response body, not the request handler
+    async with sessionmaker() as session:
+        result = await session.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            chunk = encode(partition)
+            if chunk:
+                yield chunk
+
+    if finish:
+        tail = finish()
+        if tail:
+            yield tail
+
+def export_headers(fmt: str, filename: str) -> dict:
+    headers = {"Cache-Control": "no-store"}
+    if fmt == "csv":
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return headers
@@ -0,0 +1,171 @@
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text, delete, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.background import run_periodically
+from app.cache import TTLCache
+from app.db import dialect_insert
+from app.serialization import dumps
+
+# Idempotency-Key support for order-creating endpoints.
+#
+# The first request with a key inserts an idempotency_keys row as the first
+# statement of its transaction, so a concurrent retry blocks on that row until
+# the original commits (or rolls back and frees the key). The response is stored in the
+# same transaction as the order; replays within IDEMPOTENCY_TTL get it back
+# from a per-process front cache or one primary-key read, without touching
+# the order tables. Failed requests store nothing and can be retried.
+#
+# Keys are scoped per user; reusing one for a different request is a 422.
+
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_CACHE_TTL = float(os.getenv("IDEMPOTENCY_CACHE_TTL", "300"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_SWEEP_INTERVAL = float(os.getenv("IDEMPOTENCY_SWEEP_INTERVAL", "3600"))
+MAX_KEY_LENGTH = 255
+
+logger = logging.getLogger(__name__)
+
+# Core table on its own metadata so the legacy app (its own Base) can share it
+idempotency_metadata = MetaData()
+
+idempotency_keys = Table(
+    "idempotency_keys",
+    idempotency_metadata,
+    Column("user_id", Integer, primary_key=True),
+    Column("key", String(MAX_KEY_LENGTH), primary_key=True),
+    # sha256 of method, path and body; a mismatch means the key was reused
+    Column("request_hash", String(64), nullable=False),
+    # NULL until the original request commits its response
+    Column("status_code", Integer, nullable=True),
+    Column("body", Text, nullable=True),
+    Column("expires_at", DateTime, nullable=False),
+    Index("ix_idempotency_keys_expires_at", "expires_at"),
+)
+
+# Completed responses by "<user_id>:<key>"; entries never change until expiry
+response_cache = TTLCache(min(IDEMPOTENCY_CACHE_TTL, IDEMPOTENCY_TTL), maxsize=IDEMPOTENCY_CACHE_SIZE)
+
+class StoredResponse:
+    def __init__(self, request_hash: str, status_code: int, body: str):
+        self.request_hash = request_hash
+        self.status_code = status_code
+        self.body = body
+
+    def to_response(self) -> Response:
+        return Response(
+            content=self.body,
+            status_code=self.status_code,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"}
+        )
+
+class Idempotency:
+    """A request's Idempotency-Key; every method is a no-op when none was sent.
+
+    Handlers call replay() before doing any work and return its response if
+    there is one, then finish with commit(session, data) instead of
+    session.commit().
+    """
+
+    def __init__(self, user_id: Optional[int], key: Optional[str], request_hash: str):
+        self.user_id = user_id
+        self.key = key
+        self.request_hash = request_hash
+
+    @classmethod
+    async def from_request(cls, request: Request, user_id: Optional[int]) -> "Idempotency":
+        """Keys are scoped to user_id; without a known caller the header is ignored."""
+        key = request.headers.get("Idempotency-Key") if user_id is not None else None
+        if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+        digest = hashlib.sha256(f"{request.method} {request.url.path}\n".encode())
+        digest.update(await request.body())
+        return cls(user_id, key, digest.hexdigest())
+
+    @property
+    def cache_key(self) -> str:
+        return f"{self.user_id}:{self.key}"
+
+    def _check(self, stored: StoredResponse) -> Response:
+        if stored.request_hash != self.request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        return stored.to_response()
+
+    async def replay(self, session: AsyncSession) -> Optional[Response]:
+        """The stored response for this key, or None after reserving the key for this transaction."""
+        if self.key is None:
+            return None
+
+        cached = response_cache.get(self.cache_key)
+        if cached is not None:
+            return self._check(cached)
+
+        now = datetime.utcnow()
+        insert = dialect_insert(session.bind.dialect.name)
+        stmt = insert(idempotency_keys).values(
+            user_id=self.user_id,
+            key=self.key,
+            request_hash=self.request_hash,
+            expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL)
+        )
+        # Blocks while another transaction holds the key; expired keys are taken over
+        result = await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[idempotency_keys.c.user_id, idempotency_keys.c.key],
+                set_={
+                    "request_hash": stmt.excluded.request_hash,
+                    "status_code": None,
+                    "body": None,
+                    "expires_at": stmt.excluded.expires_at,
+                },
+                where=idempotency_keys.c.expires_at < now
+            ).returning(idempotency_keys.c.key)
+        )
+        if result.first() is not None:
+            return None
+
+        result = await session.execute(
+            select(idempotency_keys.c.request_hash, idempotency_keys.c.status_code, idempotency_keys.c.body)
+            .where(idempotency_keys.c.user_id == self.user_id, idempotency_keys.c.key == self.key)
+        )
+        row = result.one()
+        if row.status_code is None:
+            # Only reachable on isolation levels where the insert does not wait
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
+
+        stored = StoredResponse(row.request_hash, row.status_code, row.body)
+        response_cache.set(self.cache_key, stored)
+        return self._check(stored)
+
+    async def commit(self, session: AsyncSession, data: Any, status_code: int = 200) -> Any:
+        """Store data as the key's response and commit the transaction; returns data."""
+        if self.key is None:
+            await session.commit()
+            return data
+
+        body = dumps(data).decode()
+        await session.execute(
+            idempotency_keys.update()
+            .where(idempotency_keys.c.user_id == self.user_id, idempotency_keys.c.key == self.key)
+            .values(status_code=status_code, body=body)
+        )
+        await session.commit()
+
+        response_cache.set(self.cache_key, StoredResponse(self.request_hash, status_code, body))
+        return data
+
+async def sweep_expired_keys(engine: AsyncEngine) -> int:
+    """Delete keys past their expiry; returns how many were deleted."""
+    async with engine.begin() as conn:
+        result = await conn.execute(delete(idempotency_keys).where(idempotency_keys.c.expires_at < datetime.utcnow()))
+        return result.rowcount
+
+async def run_key_sweeper(engine: AsyncEngine, interval: float = IDEMPOTENCY_SWEEP_INTERVAL):
+    """Sweep expired keys every interval seconds until cancelled."""
+    await run_periodically("expired idempotency key sweep", interval, lambda: sweep_expired_keys(engine))
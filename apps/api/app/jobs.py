@@ -0,0 +1,233 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text, delete, inspect, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+# Background jobs for side effects of a request (points, notifications, ...).
+#
+# A request enqueues a job by inserting an outbox row in its own transaction,
+# so the job exists exactly when the order does and nothing runs inline. A
+# JobQueue per process runs one poller that claims due rows in a batch with a
+# leased conditional UPDATE (the same arbitration as listing claims, so
+# several hosts can share the table) and runs each in its own task, up to
+# JOB_WORKERS at a time. It claims only as many rows as it has idle workers,
+# so a lease never ticks away while the job waits in memory, and an idle
+# process issues one poll per JOB_POLL_INTERVAL rather than one per worker.
+#
+# Each job runs in one transaction together with the delete of its outbox
+# row, so database side effects apply exactly once. Failures are retried with
+# exponential backoff up to JOB_MAX_ATTEMPTS, then the row is kept as "dead"
+# with its last error. A crashed process's jobs are picked up again once
+# their lease expires.
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+
+logger = logging.getLogger(__name__)
+
+# Core table on its own metadata so the legacy app (its own Base) can share it
+jobs_metadata = MetaData()
+
+outbox = Table(
+    "outbox",
+    jobs_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("kind", String(100), nullable=False),
+    Column("payload", Text, nullable=False),
+    # "pending" until it succeeds (and is deleted) or runs out of attempts ("dead")
+    Column("status", String(20), nullable=False, default="pending"),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("run_at", DateTime, nullable=False, default=datetime.utcnow),
+    # Set while a worker holds the job
+    Column("locked_until", DateTime, nullable=True),
+    Column("last_error", Text, nullable=True),
+    Column("created_at", DateTime, nullable=False, default=datetime.utcnow),
+    # Due-job scans: status = 'pending' AND run_at <= now
+    Index("ix_outbox_status_run_at", "status", "run_at"),
+)
+
+Handler = Callable[[AsyncConnection, Dict[str, Any]], Awaitable[None]]
+
+async def enqueue(session: AsyncSession, kind: str, payload: Dict[str, Any], delay: float = 0):
+    """Add a job to the caller's transaction; it runs only if that commits."""
+    await session.execute(
+        outbox.insert().values(
+            kind=kind,
+            payload=json.dumps(payload),
+            run_at=datetime.utcnow() + timedelta(seconds=delay)
+        )
+    )
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before the next try after attempts failures."""
+    return JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+
+class Job:
+    def __init__(self, id: int, kind: str, payload: str, attempts: int, locked_until: datetime):
+        self.id = id
+        self.kind = kind
+        self.payload = json.loads(payload)
+        self.attempts = attempts
+        self.locked_until = locked_until
+
+class JobQueue:
+    """One poller in this process claiming outbox jobs for up to workers concurrent runs."""
+
+    def __init__(self, engine: AsyncEngine, workers: int = JOB_WORKERS):
+        self.engine = engine
+        self.workers = workers
+        self.handlers: Dict[str, Handler] = {}
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Semaphore(workers)
+        self._poller: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    def handler(self, kind: str) -> Callable[[Handler], Handler]:
+        """Register the function that runs jobs of kind."""
+        def register(func: Handler) -> Handler:
+            self.handlers[kind] = func
+            return func
+        return register
+
+    def wake(self):
+        """Poll now instead of at the next interval (call after committing enqueued jobs)."""
+        self._wakeup.set()
+
+    async def start(self):
+        """Start polling; raises if the outbox table does not exist yet."""
+        async with self.engine.connect() as conn:
+            ready = await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table(outbox.name))
+        if not ready:
+            # Otherwise every poll would fail and log the same warning forever
+            raise RuntimeError(
+                f"the {outbox.name} table does not exist; run `python -m app.admin migrate` "
+                "(or `legacy-init` for the legacy app) before starting, or set DEV_AUTO_SEED=true locally"
+            )
+        self._poller = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        """Cancel the poller and running jobs; unfinished jobs run again after their lease."""
+        tasks = [self._poller, *self._running] if self._poller else list(self._running)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._poller = None
+        self._running.clear()
+        self._idle = asyncio.Semaphore(self.workers)
+
+    async def claim(self, limit: int) -> List[Job]:
+        """Lease up to limit due jobs to this process."""
+        now = datetime.utcnow()
+        locked_until = now + timedelta(seconds=JOB_LEASE_SECONDS)
+        unlocked = or_(outbox.c.locked_until.is_(None), outbox.c.locked_until < now)
+        due = (
+            select(outbox.c.id)
+            .where(
+                outbox.c.status == "pending",
+                outbox.c.run_at <= now,
+                unlocked,
+                # Only kinds handled here, so apps sharing the table leave each other's jobs alone
+                outbox.c.kind.in_(list(self.handlers)),
+            )
+            .order_by(outbox.c.run_at, outbox.c.id)
+            .limit(limit)
+        )
+        async with self.engine.begin() as conn:
+            # The lease condition is repeated on the UPDATE so concurrent pollers skip rows taken meanwhile
+            result = await conn.execute(
+                update(outbox)
+                .where(outbox.c.id.in_(due.scalar_subquery()), unlocked)
+                .values(attempts=outbox.c.attempts + 1, locked_until=locked_until)
+                .returning(outbox.c.id, outbox.c.kind, outbox.c.payload, outbox.c.attempts)
+            )
+            return [Job(row.id, row.kind, row.payload, row.attempts, locked_until) for row in result]
+
+    async def run(self, job: Job) -> bool:
+        """Run one claimed job; returns True if it succeeded."""
+        try:
+            async with self.engine.begin() as conn:
+                await self.handlers[job.kind](conn, job.payload)
+                # Deleting under our lease commits the side effects exactly once
+                result = await conn.execute(
+                    delete(outbox).where(outbox.c.id == job.id, outbox.c.locked_until == job.locked_until)
+                )
+                if result.rowcount != 1:
+                    raise RuntimeError(f"Lost the lease on job {job.id}")
+            return True
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            await self._failed(job, exc, dead=job.attempts >= JOB_MAX_ATTEMPTS)
+            return False
+
+    async def _failed(self, job: Job, exc: Exception, dead: bool):
+        if dead:
+            logger.error("job %d (%s) failed permanently", job.id, job.kind, exc_info=exc)
+            values = {"status": "dead"}
+        else:
+            logger.warning("job %d (%s) failed, attempt %d", job.id, job.kind, job.attempts, exc_info=exc)
+            values = {"run_at": datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts))}
+
+        try:
+            async with self.engine.begin() as conn:
+                await conn.execute(
+                    update(outbox)
+                    .where(outbox.c.id == job.id, outbox.c.locked_until == job.locked_until)
+                    .values(locked_until=None, last_error=repr(exc), **values)
+                )
+        except Exception:
+            # The lease expires and the job is retried anyway
+            logger.warning("could not record failure of job %d", job.id, exc_info=True)
+
+    async def _poll(self):
+        while True:
+            # Claim only as many jobs as there are idle workers
+            await self._idle.acquire()
+            free = 1
+            while not self._idle.locked():
+                await self._idle.acquire()
+                free += 1
+
+            # Cleared before claiming, so a wake() during the claim is not lost
+            self._wakeup.clear()
+            try:
+                jobs = await self.claim(free)
+            except Exception:
+                logger.warning("outbox poll failed", exc_info=True)
+                jobs = []
+
+            for job in jobs:
+                self._running.add(asyncio.create_task(self._run_and_release(job)))
+            for _ in range(free - len(jobs)):
+                self._idle.release()
+            if len(jobs) == free:
+                # Maybe more due: claim again as soon as a worker is idle
+                continue
+
+            # Nothing more due: wait for a wakeup or the interval
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_and_release(self, job: Job):
+        try:
+            await self.run(job)
+        finally:
+            self._idle.release()
+            self._running.discard(asyncio.current_task())
+
+    async def drain(self) -> int:
+        """Run every due job in the calling task until none are left; returns how many ran."""
+        ran = 0
+        while jobs := await self.claim(self.workers):
+            await asyncio.gather(*(self.run(job) for job in jobs))
+            ran += len(jobs)
+        return ran
@@ -1,12 +1,20 @@
+import asyncio
 import os
-from fastapi import FastAPI
+import time
+
+# Measured from first import to the end of the startup event
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.db import engine, Base, SessionLocal
-from app.models import User, Category, Listing
-from app.auth import hash_password
-from app.routers import listings, categories, auth, cart, orders, items_compat, transactions_compat
+from app.admin import DEV_AUTO_SEED, migrate_and_seed
+from app.db import engine, replica_engines
+from app.idempotency import run_key_sweeper
+from app.metrics import METRICS_ENABLED, instrument_engine, metrics_response, track_request
+from app.replicas import replica_router, run_lag_monitor, track_write
+from app.reservations import run_hold_sweeper
+from app.routers import listings, categories, auth, cart, orders, items_compat, transactions_compat, exports, notifications
+from app.tasks import job_queue
 
 # Create FastAPI app
 app = FastAPI(title="EcoFinds API", description="Sustainable resale marketplace backend")
@@ -22,12 +30,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """Pin a client's reads to the primary briefly after they write."""
+    response = await call_next(request)
+    track_write(request, response)
+    return response
+
+# Outermost, so timings cover the other middleware too
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Per-route latency and DB usage metrics plus a Server-Timing header."""
+    return await track_request(request, call_next)
+
+# Engines (by label) whose statements and pools are instrumented
+db_engines = {"primary": engine, **{f"replica{i}": replica for i, replica in enumerate(replica_engines)}}
+for name, db_engine in db_engines.items():
+    instrument_engine(db_engine, name)
+
 # Include routers
 app.include_router(auth.router, tags=["auth"])
 app.include_router(categories.router, tags=["categories"])
+# Before listings so /listings/export is not taken for /listings/{listing_id}
+app.include_router(exports.router, tags=["exports"])
 app.include_router(listings.router, tags=["listings"])
 app.include_router(cart.router, tags=["cart"])
 app.include_router(orders.router, tags=["orders"])
+app.include_router(notifications.router, tags=["notifications"])
 app.include_router(items_compat.router, tags=["items-compat"])
 app.include_router(transactions_compat.router, tags=["transactions-compat"])
 
@@ -36,83 +65,40 @@ async def health_check():
     """Health check endpoint."""
     return {"ok": True}
 
-async def create_tables_and_seed():
-    """Create tables and seed initial data."""
-    async with engine.begin() as conn:
-        # Create all tables
-        await conn.run_sync(Base.metadata.create_all)
-    
-    # Seed data
-    async with SessionLocal() as session:
-        # Check if data already exists
-        result = await session.execute(select(User).where(User.email == "john@example.com"))
-        if result.scalar_one_or_none():
-            print("Data already seeded, skipping...")
-            return
-        
-        # Seed demo user
-        demo_user = User(
-            email="john@example.com",
-            username="john",
-            password_hash=hash_password("secret")
-        )
-        session.add(demo_user)
-        await session.flush()  # Get user ID
-        
-        # Seed categories
-        categories_data = [
-            {"name": "Electronics", "slug": "electronics"},
-            {"name": "Furniture", "slug": "furniture"},
-            {"name": "Books", "slug": "books"},
-            {"name": "Fashion", "slug": "fashion"},
-            {"name": "Sports", "slug": "sports"},
-            {"name": "Home", "slug": "home"}
-        ]
-        
-        for cat_data in categories_data:
-            category = Category(**cat_data)
-            session.add(category)
-        
-        # Seed sample listings
-        listings_data = [
-            {
-                "title": "MacBook Air M2",
-                "description": "Excellent condition, barely used",
-                "category": "electronics",
-                "price": 45000.0,
-                "owner_id": demo_user.id
-            },
-            {
-                "title": "Wooden Dining Table",
-                "description": "Solid oak, seats 6 people",
-                "category": "furniture", 
-                "price": 12000.0,
-                "owner_id": demo_user.id
-            },
-            {
-                "title": "Programming Books Collection",
-                "description": "Python, JavaScript, and React books",
-                "category": "books",
-                "price": 2500.0,
-                "owner_id": demo_user.id
-            },
-            {
-                "title": "Vintage Leather Jacket",
-                "description": "Genuine leather, size M",
-                "category": "fashion",
-                "price": 8000.0,
-                "owner_id": demo_user.id
-            }
-        ]
-        
-        for listing_data in listings_data:
-            listing = Listing(**listing_data)
-            session.add(listing)
-        
-        await session.commit()
-        print("Database seeded successfully!")
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics for this worker."""
+        return metrics_response(db_engines)
 
 @app.on_event("startup")
 async def startup_event():
-    """Run on app startup."""
-    await create_tables_and_seed()
\ No newline at end of file
+    """Run on app startup.
+    
+    Schema and seed data are handled by `python -m app.admin`; workers only do
+    them when DEV_AUTO_SEED is set, so scaling out never races on DDL.
+    """
+    if DEV_AUTO_SEED:
+        await migrate_and_seed()
+    # Runs post-order side effects from the outbox (see app.jobs); refuses to
+    # start on an unmigrated database, so this comes before the other tasks
+    await job_queue.start()
+    
+    # Tidies expired cart holds; checkout does not depend on it
+    app.state.hold_sweeper = asyncio.create_task(run_hold_sweeper(engine))
+    # Deletes expired idempotency keys; expired keys are reusable either way
+    app.state.key_sweeper = asyncio.create_task(run_key_sweeper(engine))
+    if replica_router.replicas:
+        # Replicas take reads only once this has measured their lag
+        app.state.lag_monitor = asyncio.create_task(run_lag_monitor())
+    
+    app.state.startup_seconds = time.perf_counter() - IMPORT_STARTED
+    print(f"Startup completed in {app.state.startup_seconds * 1000:.1f} ms")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.hold_sweeper.cancel()
+    app.state.key_sweeper.cancel()
+    if replica_router.replicas:
+        app.state.lag_monitor.cancel()
+    await job_queue.stop()
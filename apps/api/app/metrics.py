@@ -0,0 +1,210 @@
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from fastapi import Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from app.config import env_flag
+from app.pooling import pool_stats
+
+# Request-level performance instrumentation.
+#
+# A middleware times each request and, through SQLAlchemy cursor events,
+# counts the statements it ran and the time spent in them. Per-route
+# histograms are served in the Prometheus text format at /metrics and each
+# response gets a Server-Timing header. Metrics are per process: scrape every
+# worker, or run one worker per container.
+
+METRICS_ENABLED = env_flag("METRICS_ENABLED", True)
+SERVER_TIMING = env_flag("SERVER_TIMING", True)
+# Statements slower than this are logged with their request (0 disables)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "250"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+logger = logging.getLogger(__name__)
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self._series.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency by route.",
+    ("method", "route", "status"), LATENCY_BUCKETS,
+)
+request_db_statements = Histogram(
+    "http_request_db_statements", "SQL statements executed per request.",
+    ("method", "route"), STATEMENT_BUCKETS,
+)
+request_db_duration = Histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL statements per request.",
+    ("method", "route"), LATENCY_BUCKETS,
+)
+db_statement_duration = Histogram(
+    "db_statement_duration_seconds", "Duration of individual SQL statements.",
+    ("engine",), LATENCY_BUCKETS,
+)
+
+class RequestStats:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.db_statements = 0
+        self.db_seconds = 0.0
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def instrument_engine(engine, name: str):
+    """Attach statement timing hooks to an async (or sync) engine."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["statement_started"].pop()
+        db_statement_duration.observe(elapsed, name)
+
+        stats = _current.get()
+        if stats is not None:
+            stats.db_statements += 1
+            stats.db_seconds += elapsed
+
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            logger.warning(
+                "slow query (%.1f ms on %s during %s): %s",
+                elapsed * 1000, name, f"{stats.method} {stats.path}" if stats else "-",
+                " ".join(statement.split())[:500],
+            )
+
+def _route_of(request: Request) -> str:
+    # The route template keeps label cardinality bounded (/listings/{listing_id})
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+async def _finish_after(body: AsyncIterator[bytes], finish: Callable[[], None]) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        finish()
+
+async def track_request(request: Request, call_next):
+    """Middleware body: time the request and its DB work.
+
+    Metrics are recorded once the body has been sent, so streamed responses
+    (the exports) count the statements they run while streaming. The
+    Server-Timing header goes out before the body and covers only the work
+    done until then.
+    """
+    stats = RequestStats(request.method, request.url.path)
+    token = _current.set(stats)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _current.reset(token)
+
+    # The app (and its body iterator) runs with a copy of the context, so
+    # statements executed while streaming still land in stats
+    route = _route_of(request)
+    status = str(response.status_code)
+
+    def finish():
+        if METRICS_ENABLED:
+            request_duration.observe(time.perf_counter() - started, request.method, route, status)
+            request_db_statements.observe(stats.db_statements, request.method, route)
+            request_db_duration.observe(stats.db_seconds, request.method, route)
+
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = (
+            f'app;dur={(time.perf_counter() - started) * 1000:.1f}, '
+            f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.db_statements} statements"'
+        )
+
+    body = getattr(response, "body_iterator", None)
+    if body is None:
+        finish()
+    else:
+        response.body_iterator = _finish_after(body, finish)
+    return response
+
+# (name, help, [(labels, value), ...]) for one gauge
+Gauge = Tuple[str, str, Sequence[Tuple[Dict[str, str], float]]]
+
+_gauge_sources: List[Callable[[], Iterable[Gauge]]] = []
+
+def register_gauges(source: Callable[[], Iterable[Gauge]]):
+    """Add a callable whose gauges are sampled on every /metrics render."""
+    _gauge_sources.append(source)
+    return source
+
+def _gauge_lines(name: str, help: str, samples) -> list:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return lines
+
+def render(engines: Dict[str, object]) -> str:
+    """Prometheus text exposition of every metric plus pool gauges for engines."""
+    lines = []
+    for histogram in (request_duration, request_db_statements, request_db_duration, db_statement_duration):
+        lines.extend(histogram.render())
+
+    gauges = {
+        "checked_out": "Connections currently checked out.",
+        "overflow": "Connections open beyond pool_size.",
+        "wait_seconds_total": "Total time spent waiting for a pooled connection.",
+    }
+    for key, help in gauges.items():
+        samples = [(name, pool_stats(engine).get(key)) for name, engine in engines.items()]
+        samples = [(name, value) for name, value in samples if value is not None]
+        if samples:
+            lines.append(f"# HELP db_pool_{key} {help}")
+            lines.append(f"# TYPE db_pool_{key} {'counter' if key.endswith('_total') else 'gauge'}")
+            lines.extend(f'db_pool_{key}{{engine="{name}"}} {value}' for name, value in samples)
+
+    for source in _gauge_sources:
+        for name, help, samples in source():
+            lines.extend(_gauge_lines(name, help, samples))
+
+    return "\n".join(lines) + "\n"
+
+def metrics_response(engines: Dict[str, object]) -> PlainTextResponse:
+    return PlainTextResponse(render(engines), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,169 @@
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, List
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from app.db import Base
+from app.idempotency import idempotency_keys
+from app.jobs import outbox
+from app.models import CartItem, CartSummary, Listing, Notification, Order, OrderItem, User
+from app.search import ensure_search_index
+
+# Versioned schema migrations.
+#
+# Each migration runs once, in order, inside one transaction, and is recorded
+# in schema_migrations. Steps are written to be safe on databases that were
+# created fresh from the current models (create_all) as well as on older ones.
+# Add new migrations at the end of MIGRATIONS; never edit applied ones.
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+# Arbitrary key for pg_advisory_xact_lock so concurrent runners serialize
+_MIGRATION_LOCK_ID = 7423001
+
+logger = logging.getLogger(__name__)
+
+class Migration:
+    def __init__(self, version: int, description: str, upgrade: Callable[[AsyncConnection], Awaitable[None]]):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+
+async def _column_names(conn: AsyncConnection, table: str) -> List[str]:
+    return await conn.run_sync(lambda sync_conn: [c["name"] for c in inspect(sync_conn).get_columns(table)])
+
+async def _create_indexes(conn: AsyncConnection, *indexes):
+    for index in indexes:
+        await conn.run_sync(lambda sync_conn: index.create(sync_conn, checkfirst=True))
+
+def _index(model, name: str):
+    return next(index for index in model.__table__.indexes if index.name == name)
+
+async def create_base_tables(conn: AsyncConnection):
+    tables = [model.__table__ for model in (User, Listing, CartItem, Order, OrderItem)]
+    tables.append(Base.metadata.tables["categories"])
+    await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=tables))
+
+async def add_user_token_version(conn: AsyncConnection):
+    if "token_version" not in await _column_names(conn, "users"):
+        await conn.execute(text("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"))
+
+async def add_hot_path_indexes(conn: AsyncConnection):
+    await _create_indexes(
+        conn,
+        _index(Listing, "ix_listings_created_at_id"),
+        _index(Listing, "ix_listings_owner_created_at_id"),
+        _index(Listing, "ix_listings_category_created_at_id"),
+        _index(Order, "ix_orders_user_created_at_id"),
+        _index(OrderItem, "ix_order_items_order_id"),
+    )
+
+async def add_cart_item_unique_key(conn: AsyncConnection):
+    existing = await conn.run_sync(
+        lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_unique_constraints("cart_items")}
+        | {i["name"] for i in inspect(sync_conn).get_indexes("cart_items")}
+    )
+    if "uq_cart_items_user_listing" in existing:
+        return
+
+    # Merge duplicate lines into the oldest row before enforcing uniqueness
+    await conn.execute(text("""
+        UPDATE cart_items SET qty = (
+            SELECT SUM(other.qty) FROM cart_items AS other
+            WHERE other.user_id = cart_items.user_id AND other.listing_id = cart_items.listing_id
+        )
+        WHERE id IN (SELECT MIN(id) FROM cart_items GROUP BY user_id, listing_id HAVING COUNT(*) > 1)
+    """))
+    await conn.execute(text("""
+        DELETE FROM cart_items
+        WHERE id NOT IN (SELECT MIN(id) FROM cart_items GROUP BY user_id, listing_id)
+    """))
+    # A unique index satisfies ON CONFLICT (user_id, listing_id) on both backends
+    await conn.execute(text(
+        "CREATE UNIQUE INDEX uq_cart_items_user_listing ON cart_items (user_id, listing_id)"
+    ))
+
+async def add_cart_summaries(conn: AsyncConnection):
+    await conn.run_sync(lambda sync_conn: CartSummary.__table__.create(sync_conn, checkfirst=True))
+    # Backfill from existing carts; rows already present were kept in step by the API
+    await conn.execute(text("""
+        INSERT INTO cart_summaries (user_id, line_count, item_count, subtotal, updated_at)
+        SELECT user_id, COUNT(*), SUM(qty), SUM(unit_price * qty), CURRENT_TIMESTAMP
+        FROM cart_items
+        WHERE user_id NOT IN (SELECT user_id FROM cart_summaries)
+        GROUP BY user_id
+    """))
+
+async def add_listing_reservations(conn: AsyncConnection):
+    columns = await _column_names(conn, "listings")
+    if "is_available" not in columns:
+        await conn.execute(text("ALTER TABLE listings ADD COLUMN is_available BOOLEAN NOT NULL DEFAULT TRUE"))
+        # Listings already ordered were sold before availability was tracked
+        await conn.execute(text(
+            "UPDATE listings SET is_available = FALSE WHERE id IN (SELECT listing_id FROM order_items)"
+        ))
+    if "reserved_by" not in columns:
+        await conn.execute(text("ALTER TABLE listings ADD COLUMN reserved_by INTEGER REFERENCES users(id)"))
+    if "reserved_until" not in columns:
+        await conn.execute(text("ALTER TABLE listings ADD COLUMN reserved_until TIMESTAMP"))
+    await _create_indexes(conn, _index(Listing, "ix_listings_reserved_until"))
+
+async def add_idempotency_keys(conn: AsyncConnection):
+    await conn.run_sync(lambda sync_conn: idempotency_keys.create(sync_conn, checkfirst=True))
+
+async def add_outbox_and_notifications(conn: AsyncConnection):
+    for table in (outbox, Notification.__table__):
+        await conn.run_sync(lambda sync_conn: table.create(sync_conn, checkfirst=True))
+
+async def clamp_cart_quantities(conn: AsyncConnection):
+    # Listings are one of a kind; lines added more than once had counted them twice
+    await conn.execute(text("UPDATE cart_items SET qty = 1 WHERE qty > 1"))
+    await conn.execute(text("""
+        UPDATE cart_summaries
+        SET item_count = line_count,
+            subtotal = (SELECT COALESCE(SUM(unit_price * qty), 0) FROM cart_items WHERE cart_items.user_id = cart_summaries.user_id)
+    """))
+
+MIGRATIONS = [
+    Migration(1, "base tables", create_base_tables),
+    Migration(2, "users.token_version", add_user_token_version),
+    Migration(3, "indexes for listing feeds and order history", add_hot_path_indexes),
+    Migration(4, "unique (user_id, listing_id) on cart_items", add_cart_item_unique_key),
+    Migration(5, "full-text search index on listings", ensure_search_index),
+    Migration(6, "cart_summaries", add_cart_summaries),
+    Migration(7, "listing availability and cart holds", add_listing_reservations),
+    Migration(8, "idempotency_keys", add_idempotency_keys),
+    Migration(9, "job outbox and notifications", add_outbox_and_notifications),
+    Migration(10, "one unit per cart line", clamp_cart_quantities),
+]
+
+async def applied_versions(conn: AsyncConnection) -> List[int]:
+    await conn.run_sync(migration_metadata.create_all)
+    result = await conn.execute(select(schema_migrations.c.version))
+    return [row[0] for row in result]
+
+async def run_migrations(engine: AsyncEngine) -> List[Migration]:
+    """Apply pending migrations in order; returns the ones applied."""
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text(f"SELECT pg_advisory_xact_lock({_MIGRATION_LOCK_ID})"))
+
+        done = set(await applied_versions(conn))
+        pending = [migration for migration in MIGRATIONS if migration.version not in done]
+
+        for migration in pending:
+            await migration.upgrade(conn)
+            await conn.execute(
+                schema_migrations.insert().values(version=migration.version, description=migration.description)
+            )
+            logger.info("applied migration %d: %s", migration.version, migration.description)
+
+    return pending
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime
+from sqlalchemy import Boolean, Column, Integer, String, Text, Float, ForeignKey, DateTime, Index, UniqueConstraint, true
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db import Base
@@ -10,10 +10,12 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     username = Column(String, nullable=False)
     password_hash = Column(String, nullable=False)
+    # Bumped to revoke every token issued so far
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    listings = relationship("Listing", back_populates="owner")
+    listings = relationship("Listing", back_populates="owner", foreign_keys="Listing.owner_id")
     cart_items = relationship("CartItem", back_populates="user")
     orders = relationship("Order", back_populates="user")
 
@@ -34,10 +36,22 @@ class Listing(Base):
     price = Column(Float, nullable=False)
     owner_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
+    # False once sold; holds reserve it for one cart until reserved_until (see app.reservations)
+    is_available = Column(Boolean, nullable=False, default=True, server_default=true())
+    reserved_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    reserved_until = Column(DateTime, nullable=True)
     
     # Relationships
-    owner = relationship("User", back_populates="listings")
+    owner = relationship("User", back_populates="listings", foreign_keys=[owner_id])
     cart_items = relationship("CartItem", back_populates="listing")
+    
+    # Keyset pagination indexes for the newest-first feeds (see app.migrations)
+    __table_args__ = (
+        Index("ix_listings_created_at_id", "created_at", "id"),
+        Index("ix_listings_owner_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_listings_category_created_at_id", "category", "created_at", "id"),
+        Index("ix_listings_reserved_until", "reserved_until"),
+    )
 
 class CartItem(Base):
     __tablename__ = "cart_items"
@@ -52,6 +66,21 @@ class CartItem(Base):
     # Relationships
     user = relationship("User", back_populates="cart_items")
     listing = relationship("Listing", back_populates="cart_items")
+    
+    # One row per listing per cart; also serves cart lookups by user_id
+    __table_args__ = (
+        UniqueConstraint("user_id", "listing_id", name="uq_cart_items_user_listing"),
+    )
+
+class CartSummary(Base):
+    """Per-user cart totals, kept in step with cart_items by the cart and order routes."""
+    __tablename__ = "cart_summaries"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    line_count = Column(Integer, nullable=False, default=0)
+    item_count = Column(Integer, nullable=False, default=0)
+    subtotal = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class Order(Base):
     __tablename__ = "orders"
@@ -64,6 +93,11 @@ class Order(Base):
     # Relationships
     user = relationship("User", back_populates="orders")
     items = relationship("OrderItem", back_populates="order")
+    
+    # Order history is paged newest-first per user
+    __table_args__ = (
+        Index("ix_orders_user_created_at_id", "user_id", "created_at", "id"),
+    )
 
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -76,4 +110,39 @@ class OrderItem(Base):
     qty = Column(Integer, nullable=False)
     
     # Relationships
-    order = relationship("Order", back_populates="items")
\ No newline at end of file
+    order = relationship("Order", back_populates="items")
+    
+    __table_args__ = (
+        Index("ix_order_items_order_id", "order_id"),
+    )
+
+class Notification(Base):
+    """Message for a user, written by background jobs (see app.tasks)."""
+    __tablename__ = "notifications"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String, nullable=False)
+    message = Column(String, nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # A user's notifications are paged newest-first by id
+    __table_args__ = (
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+    )
+
+# Column sets for column-only selects of the API output shapes (see app.serialization)
+LISTING_OUT_COLUMNS = (
+    Listing.id, Listing.title, Listing.description, Listing.category,
+    Listing.price, Listing.owner_id, Listing.created_at, Listing.is_available,
+)
+ORDER_OUT_COLUMNS = (Order.id, Order.user_id, Order.total, Order.created_at)
+ORDER_ITEM_OUT_COLUMNS = (
+    OrderItem.id, OrderItem.listing_id, OrderItem.title_snapshot,
+    OrderItem.price_snapshot, OrderItem.qty,
+)
+NOTIFICATION_OUT_COLUMNS = (
+    Notification.id, Notification.kind, Notification.message,
+    Notification.order_id, Notification.created_at,
+)
@@ -0,0 +1,68 @@
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+# Keyset (cursor) pagination.
+#
+# Feeds are ordered descending on a unique key tuple such as (created_at, id);
+# the cursor is an opaque token holding the key of the last row returned, so
+# every page is an index range scan instead of an OFFSET walk.
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "20"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "100"))
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+def _decode_value(obj: dict):
+    if set(obj) == {"dt"}:
+        return datetime.fromisoformat(obj["dt"])
+    return obj
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key of the last row on a page."""
+    raw = json.dumps(list(values), default=_encode_value, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded), object_hook=_decode_value)
+    except ValueError:
+        values = None
+
+    if (
+        not isinstance(values, list)
+        or len(values) != size
+        or not all(isinstance(value, (int, float, datetime)) for value in values)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return values
+
+def paginate(stmt, keys: Sequence[Any], cursor: Optional[str], limit: int):
+    """Order a query descending on keys and start it after the cursor.
+
+    One extra row is fetched so page_slice can tell if there is a next page.
+    """
+    if cursor:
+        values = decode_cursor(cursor, len(keys))
+        stmt = stmt.where(tuple_(*keys) < tuple_(*values))
+
+    return stmt.order_by(*(key.desc() for key in keys)).limit(limit + 1)
+
+def page_slice(rows: Sequence[Any], limit: int, key_of) -> Tuple[List[Any], Optional[str]]:
+    """Trim the look-ahead row and build the next cursor from the last row kept."""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(key_of(rows[-1]))
@@ -0,0 +1,80 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from app.metrics import register_gauges
+
+# bcrypt is deliberately slow (~100-300 ms per call) and releases the GIL, so
+# async handlers run it on a bounded thread pool instead of the event loop.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+# Calls allowed to wait for a free worker before new ones are rejected (0 = unbounded)
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+# Password hashing
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+class HashPool:
+    """Thread pool with a concurrency cap and queue-depth counters."""
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool; 503 if the wait queue is full."""
+        if self.max_queue and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server busy, please retry")
+
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+hash_pool = HashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
+
+@register_gauges
+def hash_pool_gauges():
+    """Hash pool load for /metrics (queued > 0 means bcrypt is the bottleneck)."""
+    stats = hash_pool.stats()
+    return [
+        ("password_hash_in_flight", "Password hash calls running or waiting for a worker.", [({}, stats["in_flight"])]),
+        ("password_hash_queued", "Password hash calls waiting for a free worker.", [({}, stats["queued"])]),
+        ("password_hash_workers", "Password hash worker threads.", [({}, stats["workers"])]),
+    ]
+
+def hash_password(password: str) -> str:
+    """Hash a password using bcrypt (blocking)."""
+    return pwd_context.hash(password)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash (blocking)."""
+    return pwd_context.verify(plain_password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the hash pool."""
+    return await hash_pool.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hash pool."""
+    return await hash_pool.run(verify_password, plain_password, hashed_password)
@@ -0,0 +1,88 @@
+import os
+import time
+from uuid import uuid4
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.config import env_flag
+
+# Connection pool settings, shared by every engine the API creates.
+#
+# Size pools per worker: total connections = workers * (size + overflow), which
+# must stay under the server's (or PgBouncer's) max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = env_flag("DB_POOL_PRE_PING", True)
+# asyncpg prepared-statement cache per connection
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# PgBouncer transaction pooling cannot keep named prepared statements
+DB_PGBOUNCER = env_flag("DB_PGBOUNCER", False)
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection (including connects)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+def engine_options(url: str) -> dict:
+    """Keyword arguments for create_async_engine for a database URL."""
+    if url.startswith("sqlite"):
+        # SQLite picks its own pool; queue-pool sizing does not apply
+        return {}
+
+    options = {
+        "poolclass": InstrumentedPool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+    if "+asyncpg" in url:
+        if DB_PGBOUNCER:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                # Unique names so statements never collide across server connections
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            }
+        else:
+            options["connect_args"] = {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+
+    return options
+
+def pool_stats(engine) -> dict:
+    """Gauges and checkout-wait counters for an engine's pool."""
+    pool = engine.pool
+    stats = {"status": pool.status()}
+
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+        })
+
+    if isinstance(pool, InstrumentedPool):
+        stats.update({
+            "checkouts": pool.checkouts,
+            "wait_seconds_total": pool.wait_seconds_total,
+            "wait_seconds_max": pool.wait_seconds_max,
+        })
+
+    return stats
@@ -0,0 +1,115 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Set
+from app.redis_client import is_redis_url, redis_from_url
+
+# Topic pub/sub for pushing events (chat messages) to connected clients.
+#
+# The memory broker fans out within one worker process; with several workers
+# or hosts, point PUBSUB_URL at Redis so every worker sees every publish.
+# Subscribers that fall PUBSUB_QUEUE_SIZE messages behind are dropped, and
+# clients catch up from the database when they reconnect (since_id).
+
+PUBSUB_URL = os.getenv("PUBSUB_URL", "memory://")
+PUBSUB_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", "100"))
+
+class Subscription:
+    """Bounded queue of messages for one subscriber."""
+
+    def __init__(self, maxsize: int):
+        # One extra slot so close() can always queue its end marker
+        self.queue: "asyncio.Queue[str | None]" = asyncio.Queue(maxsize + 1)
+        self.maxsize = maxsize
+        self.closed = False
+
+    def deliver(self, data: str) -> bool:
+        """Queue data; a full queue closes the subscription and returns False."""
+        if self.closed:
+            return False
+        if self.queue.qsize() >= self.maxsize:
+            self.close()
+            return False
+        self.queue.put_nowait(data)
+        return True
+
+    def close(self):
+        """End iteration once the queued messages are consumed."""
+        if not self.closed:
+            self.closed = True
+            self.queue.put_nowait(None)
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        while (data := await self.queue.get()) is not None:
+            yield data
+
+class MemoryBroker:
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._topics: Dict[str, Set[Subscription]] = {}
+
+    async def publish(self, topic: str, data: str):
+        for subscription in list(self._topics.get(topic, ())):
+            if not subscription.deliver(data):
+                self._topics[topic].discard(subscription)
+
+    @asynccontextmanager
+    async def subscribe(self, topic: str) -> AsyncIterator[Subscription]:
+        subscription = Subscription(self.queue_size)
+        self._topics.setdefault(topic, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+
+class RedisBroker:
+    """Broker over a redis.asyncio client (see app.redis_client)."""
+
+    def __init__(self, client, queue_size: int):
+        self.client = client
+        self.queue_size = queue_size
+
+    async def publish(self, topic: str, data: str):
+        await self.client.publish(topic, data)
+
+    @asynccontextmanager
+    async def subscribe(self, topic: str) -> AsyncIterator[Subscription]:
+        subscription = Subscription(self.queue_size)
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(topic)
+
+        async def pump():
+            try:
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    if not subscription.deliver(data.decode() if isinstance(data, bytes) else data):
+                        return
+            finally:
+                # A dropped Redis connection ends the subscription too
+                subscription.close()
+
+        task = asyncio.create_task(pump())
+        try:
+            yield subscription
+        finally:
+            task.cancel()
+            await pubsub.unsubscribe(topic)
+            await pubsub.close()
+
+def build_broker(url: str):
+    """Broker for a PUBSUB_URL: memory:// or redis://..."""
+    if url.startswith("memory://"):
+        return MemoryBroker(PUBSUB_QUEUE_SIZE)
+
+    if is_redis_url(url):
+        return RedisBroker(redis_from_url(url, "PUBSUB_URL"), PUBSUB_QUEUE_SIZE)
+
+    raise ValueError(f"Unsupported PUBSUB_URL: {url}")
+
+broker = build_broker(PUBSUB_URL)
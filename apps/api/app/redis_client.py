@@ -0,0 +1,20 @@
+try:
+    import redis.asyncio as redis
+except ImportError:  # optional dependency, only needed for redis:// URLs
+    redis = None
+
+# Redis clients for the URL-configured backends (response cache, pub/sub).
+#
+# Backends take any redis.asyncio-compatible client rather than building
+# their own, so tests can hand them a local fake.
+
+REDIS_URL_SCHEMES = ("redis://", "rediss://", "unix://")
+
+def is_redis_url(url: str) -> bool:
+    return url.startswith(REDIS_URL_SCHEMES)
+
+def redis_from_url(url: str, setting: str):
+    """redis.asyncio client for url; setting names the env var in errors."""
+    if redis is None:
+        raise RuntimeError(f"{setting} is a Redis URL but the redis package is not installed")
+    return redis.from_url(url)
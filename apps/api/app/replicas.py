@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import hmac
+import itertools
+import logging
+import math
+import os
+import time
+from typing import List, Optional
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from app.auth import SECRET_KEY
+from app.db import SessionLocal, replica_engines
+from app.background import run_periodically
+from app.metrics import register_gauges
+
+# Read-replica routing for safe (GET) endpoints.
+#
+# Reads go round-robin to replicas whose replication lag is within bounds and
+# fall back to the primary otherwise. Lag is measured by a background task
+# (run_lag_monitor); requests only read the last result, and a replica whose
+# measurement is stale counts as unhealthy.
+#
+# After a successful write the client gets a signed cookie holding a deadline
+# READ_YOUR_WRITES_SECONDS ahead; until then its reads go to the primary, on
+# whichever worker or host serves them, so it always sees its own changes.
+#
+# Routes backed by the response cache load from the primary instead (see
+# app.response_cache), since a stale replica read would be cached for everyone.
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+READ_YOUR_WRITES_COOKIE = "read_primary_until"
+
+# Seconds the replica is behind; 0 when fully caught up (or not a standby)
+_PG_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+logger = logging.getLogger(__name__)
+
+class Replica:
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.sessionmaker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        # Unused until the lag monitor has measured it
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.checked_at = 0.0
+
+    @property
+    def label(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+    def usable(self) -> bool:
+        """Healthy as of a measurement recent enough to trust."""
+        return self.healthy and time.monotonic() - self.checked_at < 3 * REPLICA_LAG_CHECK_INTERVAL
+
+    async def check(self):
+        """Measure replication lag and update health."""
+        try:
+            async with self.engine.connect() as conn:
+                if conn.dialect.name == "postgresql":
+                    self.lag = float((await conn.execute(text(_PG_LAG_SQL))).scalar() or 0)
+                else:
+                    await conn.execute(text("SELECT 1"))
+                    self.lag = 0.0
+            self.healthy = self.lag <= REPLICA_MAX_LAG_SECONDS
+        except Exception:
+            logger.warning("replica health check failed for %s", self.engine.url, exc_info=True)
+            self.healthy = False
+        finally:
+            self.checked_at = time.monotonic()
+
+class ReplicaRouter:
+    def __init__(self, engines: List[AsyncEngine]):
+        self.replicas = [Replica(engine) for engine in engines]
+        self._turn = itertools.count()
+
+    def choose(self) -> Optional[Replica]:
+        """The next usable replica, or None for the primary."""
+        if not self.replicas:
+            return None
+        
+        start = next(self._turn)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.usable():
+                return replica
+        
+        return None
+
+    async def check_all(self):
+        await asyncio.gather(*(replica.check() for replica in self.replicas))
+
+replica_router = ReplicaRouter(replica_engines)
+
+@register_gauges
+def replica_gauges():
+    """Lag and health per replica for /metrics."""
+    replicas = replica_router.replicas
+    if not replicas:
+        return []
+    return [
+        (
+            "db_replica_lag_seconds",
+            "Replication lag at the last check (-1 if it failed).",
+            [({"replica": replica.label}, replica.lag if replica.lag is not None else -1) for replica in replicas],
+        ),
+        (
+            "db_replica_healthy",
+            "1 if the replica is receiving reads.",
+            [({"replica": replica.label}, int(replica.usable())) for replica in replicas],
+        ),
+    ]
+
+async def run_lag_monitor(interval: float = REPLICA_LAG_CHECK_INTERVAL):
+    """Measure every replica's lag every interval seconds until cancelled."""
+    await run_periodically("replica lag check", interval, replica_router.check_all, immediately=True)
+
+def _signature(value: str) -> str:
+    return hmac.new(SECRET_KEY.encode(), f"{READ_YOUR_WRITES_COOKIE}:{value}".encode(), hashlib.sha256).hexdigest()
+
+def reads_pinned_to_primary(request: Request) -> bool:
+    """True while the client's signed read-your-writes cookie is valid and unexpired."""
+    until, _, signature = request.cookies.get(READ_YOUR_WRITES_COOKIE, "").partition(":")
+    if not until or not hmac.compare_digest(signature, _signature(until)):
+        return False
+    try:
+        return float(until) > time.time()
+    except ValueError:
+        return False
+
+def read_sessionmaker(request: Request) -> async_sessionmaker:
+    """Session factory for a read: a replica when safe, else the primary."""
+    replica = None if reads_pinned_to_primary(request) else replica_router.choose()
+    return replica.sessionmaker if replica else SessionLocal
+
+async def get_read_session(request: Request):
+    """Dependency for read-only endpoints."""
+    async with read_sessionmaker(request)() as session:
+        yield session
+
+def track_write(request: Request, response: Response):
+    """After a successful unsafe request, pin the client's reads to the primary for a while."""
+    if not replica_router.replicas or request.method in ("GET", "HEAD", "OPTIONS") or response.status_code >= 400:
+        return
+    
+    until = f"{time.time() + READ_YOUR_WRITES_SECONDS:.3f}"
+    response.set_cookie(
+        READ_YOUR_WRITES_COOKIE,
+        f"{until}:{_signature(until)}",
+        max_age=math.ceil(READ_YOUR_WRITES_SECONDS),
+        httponly=True,
+        samesite="lax"
+    )
@@ -0,0 +1,82 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Set
+from sqlalchemy import and_, or_, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.background import run_periodically
+from app.models import Listing
+
+# Oversell protection for one-of-a-kind listings.
+#
+# Every state change is a single conditional UPDATE, so the database's row
+# locks arbitrate concurrent buyers without SELECT ... FOR UPDATE round trips:
+#
+#   hold    add to cart: reserve the listing for CART_HOLD_SECONDS
+#   claim   checkout/purchase: mark it sold (is_available = false)
+#   release remove from cart: drop the caller's hold
+#
+# A listing can be held or claimed by a user when it is available and not
+# held by someone else (expired holds count as free). The sweeper only tidies
+# expired holds; correctness never depends on it running.
+
+CART_HOLD_SECONDS = int(os.getenv("CART_HOLD_SECONDS", "900"))
+HOLD_SWEEP_INTERVAL = float(os.getenv("HOLD_SWEEP_INTERVAL", "60"))
+
+logger = logging.getLogger(__name__)
+
+def _free_for(user_id: int, now: datetime):
+    return and_(
+        Listing.is_available,
+        or_(
+            Listing.reserved_by.is_(None),
+            Listing.reserved_by == user_id,
+            Listing.reserved_until < now,
+        ),
+    )
+
+async def hold_listings(session: AsyncSession, user_id: int, listing_ids: Iterable[int]) -> Dict[int, float]:
+    """Reserve (or extend the caller's hold on) listings; returns {id: price} of those held."""
+    now = datetime.utcnow()
+    result = await session.execute(
+        update(Listing)
+        .where(Listing.id.in_(list(listing_ids)), _free_for(user_id, now))
+        .values(reserved_by=user_id, reserved_until=now + timedelta(seconds=CART_HOLD_SECONDS))
+        .returning(Listing.id, Listing.price)
+        .execution_options(synchronize_session=False)
+    )
+    return dict(result.all())
+
+async def release_holds(session: AsyncSession, user_id: int, listing_ids: Iterable[int]):
+    """Drop the caller's holds on listings (others' holds are untouched)."""
+    await session.execute(
+        update(Listing)
+        .where(Listing.id.in_(list(listing_ids)), Listing.reserved_by == user_id)
+        .values(reserved_by=None, reserved_until=None)
+        .execution_options(synchronize_session=False)
+    )
+
+async def claim_listings(session: AsyncSession, user_id: int, listing_ids: Iterable[int]) -> Set[int]:
+    """Mark listings sold to user_id; returns the ids claimed (the rest were taken)."""
+    result = await session.execute(
+        update(Listing)
+        .where(Listing.id.in_(list(listing_ids)), _free_for(user_id, datetime.utcnow()))
+        .values(is_available=False, reserved_by=None, reserved_until=None)
+        .returning(Listing.id)
+        .execution_options(synchronize_session=False)
+    )
+    return set(result.scalars())
+
+async def sweep_expired_holds(engine: AsyncEngine) -> int:
+    """Clear holds past their expiry; returns how many were cleared."""
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            update(Listing)
+            .where(Listing.reserved_until < datetime.utcnow())
+            .values(reserved_by=None, reserved_until=None)
+        )
+        return result.rowcount
+
+async def run_hold_sweeper(engine: AsyncEngine, interval: float = HOLD_SWEEP_INTERVAL):
+    """Sweep expired holds every interval seconds until cancelled."""
+    await run_periodically("expired hold sweep", interval, lambda: sweep_expired_holds(engine))
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlencode
+from app.cache import CachedResponse, TTLCache, category_cache
+from app.redis_client import is_redis_url, redis_from_url
+
+# Read-through cache for anonymous, user-independent GET responses.
+#
+# Keys are "<namespace>:<generation>:<normalized params>". Invalidating a
+# namespace bumps its generation counter, so stale entries are never read
+# again and simply age out (no key scans, works the same on Redis).
+#
+# Misses are loaded from the primary, never a read replica: a lagging replica
+# could return pre-write rows right after a write bumped the generation, and
+# they would be cached under the new generation until the TTL. Cached routes
+# therefore take get_session; hits never open a connection anyway.
+
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "memory://")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+# Clients always revalidate; unchanged pages come back as 304
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "0"))
+
+logger = logging.getLogger(__name__)
+
+class MemoryBackend:
+    """In-process LRU of encoded bodies with per-entry expiry (a TTLCache)."""
+
+    def __init__(self, maxsize: int):
+        self._entries = TTLCache(RESPONSE_CACHE_TTL, maxsize=maxsize)
+        self._counters: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._entries.set(key, value, ttl)
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+class RedisBackend:
+    """Backend over a redis.asyncio client (see app.redis_client)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.client.set(key, value, ex=max(1, int(ttl)))
+
+    async def get_counter(self, key: str) -> int:
+        value = await self.client.get(key)
+        return int(value) if value is not None else 0
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(key)
+
+def build_backend(url: str):
+    """Backend for a RESPONSE_CACHE_URL: memory:// or redis://..."""
+    if url.startswith("memory://"):
+        return MemoryBackend(RESPONSE_CACHE_SIZE)
+
+    if is_redis_url(url):
+        return RedisBackend(redis_from_url(url, "RESPONSE_CACHE_URL"))
+
+    raise ValueError(f"Unsupported RESPONSE_CACHE_URL: {url}")
+
+def normalize_params(params: Dict[str, Any]) -> str:
+    """Stable query string for a cache key; None values are dropped."""
+    return urlencode(sorted((name, value) for name, value in params.items() if value is not None))
+
+class ResponseCache:
+    """Read-through cache with per-key single-flight loading.
+
+    The load runs in the request that missed first (it needs that request's
+    session); if that request is cancelled, a waiting one takes over.
+    Backend errors are logged and treated as misses, so a cache outage
+    degrades to hitting the database rather than failing requests.
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self._inflight: Dict[str, "asyncio.Future[CachedResponse]"] = {}
+
+    async def _generation(self, namespace: str) -> int:
+        try:
+            return await self.backend.get_counter(f"{namespace}:generation")
+        except Exception:
+            logger.warning("response cache generation read failed", exc_info=True)
+            return -1
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        params: Dict[str, Any],
+        loader: Callable[[], Awaitable[Any]]
+    ) -> CachedResponse:
+        """Return the cached response for params, calling loader at most once per key."""
+        if self.ttl <= 0:
+            return CachedResponse.from_data(await loader())
+
+        generation = await self._generation(namespace)
+        key = f"{namespace}:{generation}:{normalize_params(params)}"
+
+        if generation >= 0:
+            try:
+                body = await self.backend.get(key)
+            except Exception:
+                logger.warning("response cache read failed", exc_info=True)
+                body = None
+            if body is not None:
+                return CachedResponse(body)
+
+        # Single-flight: concurrent misses for the same key share one load
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                # Shielded so a waiter that is cancelled does not cancel the load for the others
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+            # The loading request was cancelled (its client went away), not this one: start
+            # over, so the first waiter back loads and the rest wait on it or hit the cache
+            return await self.get_or_load(namespace, params, loader)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark exceptions as retrieved when nobody else was waiting
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._inflight[key] = future
+
+        try:
+            cached = CachedResponse.from_data(await loader())
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        future.set_result(cached)
+
+        if generation >= 0:
+            try:
+                await self.backend.set(key, cached.body, self.ttl)
+            except Exception:
+                logger.warning("response cache write failed", exc_info=True)
+
+        return cached
+
+    async def invalidate(self, namespace: str):
+        """Make every cached entry in namespace unreachable."""
+        try:
+            await self.backend.incr(f"{namespace}:generation")
+        except Exception:
+            logger.warning("response cache invalidation failed", exc_info=True)
+
+response_cache = ResponseCache(build_backend(RESPONSE_CACHE_URL), RESPONSE_CACHE_TTL)
+
+async def invalidate_listing_caches():
+    """Call after listings are created or changed (including being bought)."""
+    category_cache.invalidate()
+    await response_cache.invalidate("listings")
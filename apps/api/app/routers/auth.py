@@ -4,7 +4,7 @@ from sqlalchemy import select
 from app.db import get_session
 from app.models import User
 from app.schemas import UserCreate, UserLogin, UserOut, Token
-from app.auth import hash_password, verify_password, create_access_token, get_current_user
+from app.auth import hash_password_async, verify_password_async, create_access_token, token_claims, get_current_user_record
 
 router = APIRouter()
 
@@ -25,7 +25,7 @@ async def register(
         )
     
     # Create new user
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password_async(user_data.password)
     user = User(
         email=user_data.email,
         username=user_data.username,
@@ -37,7 +37,7 @@ async def register(
     await session.refresh(user)
     
     # Create access token
-    access_token = create_access_token(data={"sub": str(user.id)})
+    access_token = create_access_token(data=token_claims(user))
     
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -51,18 +51,18 @@ async def login(
     result = await session.execute(select(User).where(User.email == user_data.email))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(user_data.password, user.password_hash):
+    if not user or not await verify_password_async(user_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
     # Create access token
-    access_token = create_access_token(data={"sub": str(user.id)})
+    access_token = create_access_token(data=token_claims(user))
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/users/me", response_model=UserOut)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user_record)):
     """Get current user information."""
     return current_user
\ No newline at end of file
@@ -1,24 +1,38 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.db import get_session
-from app.models import CartItem, Listing, User
-from app.schemas import CartItemCreate, CartItemUpdate, CartItemOut, CartOut
-from app.auth import get_current_user
+from sqlalchemy import select, delete, literal
+from app.db import dialect_insert, get_session
+from app.models import CartItem, Listing
+from app.schemas import CartItemCreate, CartItemUpdate, CartItemOut, CartOut, CartBatch, CartSummaryOut
+from app.auth import Principal, get_current_user
+from app.cart_summary import adjust_cart_summary, get_cart_summary, refresh_cart_summary
+from app.reservations import hold_listings, release_holds
 
 router = APIRouter()
 
-@router.get("/cart", response_model=CartOut)
-async def get_cart(
-    current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
-):
-    """Get current user's cart."""
+MAX_CART_OPERATIONS = 200
+
+# Listings are one of a kind, so a cart line always holds exactly one. The qty
+# fields and PATCH /cart/items/{id} are deprecated: they accept only 1 (or no
+# qty) and are kept so existing clients keep working.
+ONE_PER_LISTING = "Quantity must be 1 (listings are one of a kind)"
+
+async def unavailable_error(session: AsyncSession, listing_ids) -> HTTPException:
+    """404 if any listing does not exist, else 409 (sold or held by another cart)."""
+    listing_ids = sorted(listing_ids)
+    result = await session.execute(select(Listing.id).where(Listing.id.in_(listing_ids)))
+    missing = sorted(set(listing_ids) - set(result.scalars()))
+    if missing:
+        return HTTPException(status_code=404, detail=f"Listing not found: {missing[0]}")
+    return HTTPException(status_code=409, detail=f"Listing not available: {listing_ids[0]}")
+
+async def load_cart(session: AsyncSession, user_id: int) -> CartOut:
+    """Build the cart view for a user."""
     result = await session.execute(
         select(CartItem, Listing)
         .join(Listing)
-        .where(CartItem.user_id == current_user.id)
+        .where(CartItem.user_id == user_id)
     )
     cart_data = result.all()
     
@@ -39,125 +53,191 @@ async def get_cart(
     
     return CartOut(items=items, subtotal=subtotal)
 
+@router.get("/cart", response_model=CartOut)
+async def get_cart(
+    current_user: Principal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """Get current user's cart."""
+    return await load_cart(session, current_user.id)
+
+@router.get("/cart/summary", response_model=CartSummaryOut)
+async def get_summary(
+    current_user: Principal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """Get line count, item count and subtotal of the current user's cart (for badges)."""
+    return await get_cart_summary(session, current_user.id)
+
+@router.patch("/cart", response_model=CartOut)
+async def batch_update_cart(
+    batch: CartBatch,
+    current_user: Principal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """Apply add/update/remove operations (keyed by listing) in one transaction.
+    
+    Operations are folded per listing first, then applied with one hold
+    UPDATE (which also reads prices), at most one DELETE and release, and two
+    multi-row upserts.
+    """
+    if len(batch.operations) > MAX_CART_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_CART_OPERATIONS} operations per request")
+    
+    # listing_id -> "keep" | "remove", last operation wins; add and update both leave one in the cart
+    pending = {}
+    for operation in batch.operations:
+        if operation.op != "remove" and operation.qty not in (None, 1):
+            raise HTTPException(status_code=400, detail=ONE_PER_LISTING)
+        pending[operation.listing_id] = "remove" if operation.op == "remove" else "keep"
+    
+    removes = [listing_id for listing_id, kind in pending.items() if kind == "remove"]
+    keeps = [listing_id for listing_id, kind in pending.items() if kind == "keep"]
+    
+    if keeps:
+        prices = await hold_listings(session, current_user.id, keeps)
+        unavailable = set(keeps) - set(prices)
+        if unavailable:
+            raise await unavailable_error(session, unavailable)
+    
+    if removes:
+        await session.execute(
+            delete(CartItem).where(CartItem.user_id == current_user.id, CartItem.listing_id.in_(removes))
+        )
+        await release_holds(session, current_user.id, removes)
+    
+    dialect = session.bind.dialect.name
+    if keeps:
+        await session.execute(bulk_upsert_cart_items(dialect, current_user.id, prices))
+    
+    await session.execute(refresh_cart_summary(dialect, current_user.id))
+    await session.commit()
+    
+    return await load_cart(session, current_user.id)
+
+def bulk_upsert_cart_items(dialect: str, user_id: int, prices: dict):
+    """Multi-row upsert putting listings ({id: price}) in a cart once each."""
+    insert = dialect_insert(dialect)
+    
+    stmt = insert(CartItem).values([
+        {"user_id": user_id, "listing_id": listing_id, "qty": 1, "unit_price": price}
+        for listing_id, price in prices.items()
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=[CartItem.user_id, CartItem.listing_id],
+        set_={"qty": stmt.excluded.qty}
+    )
+
+def cart_line_columns(listing_id: int):
+    """CartItemOut columns of a cart line (title read from the listing)."""
+    title = select(Listing.title).where(Listing.id == listing_id).scalar_subquery()
+    return [CartItem.id, CartItem.listing_id, title.label("title"), CartItem.unit_price, CartItem.qty]
+
+def upsert_cart_item(dialect: str, user_id: int, listing_id: int):
+    """INSERT ... ON CONFLICT statement putting a listing in a cart.
+    
+    The row is copied from the listing (so a missing listing inserts nothing)
+    and a listing already in the cart keeps its line unchanged. Returns the
+    CartItemOut columns either way.
+    """
+    insert = dialect_insert(dialect)
+    
+    stmt = insert(CartItem).from_select(
+        [CartItem.user_id, CartItem.listing_id, CartItem.qty, CartItem.unit_price],
+        select(literal(user_id), Listing.id, literal(1), Listing.price).where(Listing.id == listing_id)
+    )
+    # A no-op update rather than DO NOTHING, so an existing line is returned too
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CartItem.user_id, CartItem.listing_id],
+        set_={"qty": CartItem.qty}
+    )
+    return stmt.returning(*cart_line_columns(listing_id))
+
 @router.post("/cart/items", response_model=CartItemOut)
 async def add_to_cart(
     item_data: CartItemCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
-    """Add item to cart."""
-    # Validate quantity
-    if item_data.qty <= 0:
-        raise HTTPException(status_code=400, detail="Quantity must be greater than 0")
+    """Add item to cart, holding the listing for this cart (hold, line upsert, summary upsert).
     
-    # Get listing to verify it exists and get price
-    result = await session.execute(select(Listing).where(Listing.id == item_data.listing_id))
-    listing = result.scalar_one_or_none()
+    Adding a listing already in the cart only extends the hold.
+    """
+    if item_data.qty != 1:
+        raise HTTPException(status_code=400, detail=ONE_PER_LISTING)
     
-    if not listing:
-        raise HTTPException(status_code=404, detail="Listing not found")
+    if not await hold_listings(session, current_user.id, [item_data.listing_id]):
+        raise await unavailable_error(session, [item_data.listing_id])
     
-    # Check if item already in cart
-    result = await session.execute(
-        select(CartItem).where(
-            CartItem.user_id == current_user.id,
-            CartItem.listing_id == item_data.listing_id
-        )
+    dialect = session.bind.dialect.name
+    result = await session.execute(upsert_cart_item(dialect, current_user.id, item_data.listing_id))
+    cart_item = result.first()
+    
+    # Recomputed rather than adjusted: the upsert does not say whether the line is new
+    await session.execute(refresh_cart_summary(dialect, current_user.id))
+    await session.commit()
+    
+    return CartItemOut(
+        id=cart_item.id,
+        listing_id=cart_item.listing_id,
+        title=cart_item.title,
+        unit_price=cart_item.unit_price,
+        qty=cart_item.qty,
+        line_total=cart_item.unit_price * cart_item.qty
     )
-    existing_item = result.scalar_one_or_none()
-    
-    if existing_item:
-        # Update quantity
-        existing_item.qty += item_data.qty
-        await session.commit()
-        await session.refresh(existing_item)
-        
-        line_total = existing_item.unit_price * existing_item.qty
-        return CartItemOut(
-            id=existing_item.id,
-            listing_id=existing_item.listing_id,
-            title=listing.title,
-            unit_price=existing_item.unit_price,
-            qty=existing_item.qty,
-            line_total=line_total
-        )
-    else:
-        # Add new item
-        cart_item = CartItem(
-            user_id=current_user.id,
-            listing_id=item_data.listing_id,
-            qty=item_data.qty,
-            unit_price=listing.price
-        )
-        
-        session.add(cart_item)
-        await session.commit()
-        await session.refresh(cart_item)
-        
-        line_total = cart_item.unit_price * cart_item.qty
-        return CartItemOut(
-            id=cart_item.id,
-            listing_id=cart_item.listing_id,
-            title=listing.title,
-            unit_price=cart_item.unit_price,
-            qty=cart_item.qty,
-            line_total=line_total
-        )
 
-@router.patch("/cart/items/{item_id}", response_model=CartItemOut)
+@router.patch("/cart/items/{item_id}", response_model=CartItemOut, deprecated=True)
 async def update_cart_item(
     item_id: int,
     item_data: CartItemUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
-    """Update cart item quantity."""
-    # Validate quantity
-    if item_data.qty <= 0:
-        raise HTTPException(status_code=400, detail="Quantity must be greater than 0")
+    """Deprecated: a cart line always holds one unit, so qty must be 1 and the line is returned unchanged."""
+    if item_data.qty != 1:
+        raise HTTPException(status_code=400, detail=ONE_PER_LISTING)
     
     result = await session.execute(
-        select(CartItem, Listing)
+        select(CartItem.id, CartItem.listing_id, Listing.title, CartItem.unit_price, CartItem.qty)
         .join(Listing)
         .where(CartItem.id == item_id, CartItem.user_id == current_user.id)
     )
-    cart_data = result.first()
+    cart_item = result.first()
     
-    if not cart_data:
+    if not cart_item:
         raise HTTPException(status_code=404, detail="Cart item not found")
     
-    cart_item, listing = cart_data
-    cart_item.qty = item_data.qty
-    
-    await session.commit()
-    await session.refresh(cart_item)
-    
-    line_total = cart_item.unit_price * cart_item.qty
     return CartItemOut(
         id=cart_item.id,
         listing_id=cart_item.listing_id,
-        title=listing.title,
+        title=cart_item.title,
         unit_price=cart_item.unit_price,
         qty=cart_item.qty,
-        line_total=line_total
+        line_total=cart_item.unit_price * cart_item.qty
     )
 
 @router.delete("/cart/items/{item_id}")
 async def remove_from_cart(
     item_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
     """Remove item from cart."""
+    # The summary delta comes from the row actually deleted, so a repeated DELETE changes nothing
     result = await session.execute(
-        select(CartItem).where(CartItem.id == item_id, CartItem.user_id == current_user.id)
+        delete(CartItem)
+        .where(CartItem.id == item_id, CartItem.user_id == current_user.id)
+        .returning(CartItem.listing_id, CartItem.qty, CartItem.unit_price)
     )
-    cart_item = result.scalar_one_or_none()
+    removed = result.first()
     
-    if not cart_item:
+    if not removed:
         raise HTTPException(status_code=404, detail="Cart item not found")
     
-    await session.delete(cart_item)
+    await release_holds(session, current_user.id, [removed.listing_id])
+    await session.execute(adjust_cart_summary(
+        session.bind.dialect.name, current_user.id, -1, -removed.qty, -removed.unit_price * removed.qty
+    ))
     await session.commit()
     
     return {"message": "Item removed from cart"}
\ No newline at end of file
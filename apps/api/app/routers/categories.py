@@ -1,16 +1,22 @@
 from typing import List
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.db import get_session
 from app.models import Category
 from app.schemas import CategoryOut
+from app.cache import CATEGORY_MAX_AGE, CachedResponse, category_cache, cached_json_response
 
 router = APIRouter()
 
 @router.get("/categories", response_model=List[CategoryOut])
-async def get_categories(session: AsyncSession = Depends(get_session)):
-    """Get all categories."""
-    result = await session.execute(select(Category))
-    categories = result.scalars().all()
-    return categories
\ No newline at end of file
+async def get_categories(request: Request, session: AsyncSession = Depends(get_session)):
+    """Get all categories (served from the in-process cache)."""
+    cached = category_cache.get("categories")
+    
+    if cached is None:
+        result = await session.execute(select(Category))
+        categories = [CategoryOut.model_validate(category) for category in result.scalars().all()]
+        cached = category_cache.set("categories", CachedResponse.from_data(categories))
+    
+    return cached_json_response(request, cached, CATEGORY_MAX_AGE)
\ No newline at end of file
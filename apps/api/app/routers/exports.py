@@ -0,0 +1,107 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from app.models import Listing, Order, OrderItem
+from app.auth import Principal, get_current_user
+from app.export import MEDIA_TYPES, csv_lines, export_headers, ndjson_lines, stream_rows
+from app.replicas import read_sessionmaker
+
+router = APIRouter()
+
+FORMAT_QUERY = Query("ndjson", alias="format", pattern="^(ndjson|csv)$")
+
+LISTING_COLUMNS = ["id", "title", "description", "category", "price", "owner_id", "created_at"]
+ORDER_ITEM_COLUMNS = ["order_id", "created_at", "total", "item_id", "listing_id", "title", "price", "qty"]
+
+@router.get("/listings/export")
+async def export_listings(
+    request: Request,
+    fmt: str = FORMAT_QUERY,
+    category: Optional[str] = Query(None, description="Filter by category")
+):
+    """Stream every listing as NDJSON or CSV."""
+    stmt = select(*(getattr(Listing, column) for column in LISTING_COLUMNS)).order_by(Listing.id)
+    if category:
+        stmt = stmt.where(Listing.category == category)
+    
+    if fmt == "csv":
+        body = stream_rows(
+            read_sessionmaker(request),
+            stmt,
+            csv_lines,
+            header=csv_lines([LISTING_COLUMNS])
+        )
+    else:
+        body = stream_rows(
+            read_sessionmaker(request),
+            stmt,
+            lambda rows: ndjson_lines(dict(row._mapping) for row in rows)
+        )
+    
+    return StreamingResponse(body, media_type=MEDIA_TYPES[fmt], headers=export_headers(fmt, "listings"))
+
+class OrderGrouper:
+    """Folds consecutive (order, item) rows into one NDJSON object per order."""
+    
+    def __init__(self):
+        self.current = None
+    
+    def encode(self, rows) -> bytes:
+        done = []
+        for row in rows:
+            if self.current is None or self.current["id"] != row.order_id:
+                if self.current is not None:
+                    done.append(self.current)
+                self.current = {"id": row.order_id, "created_at": row.created_at, "total": row.total, "items": []}
+            if row.item_id is not None:
+                self.current["items"].append({
+                    "id": row.item_id,
+                    "listing_id": row.listing_id,
+                    "title_snapshot": row.title,
+                    "price_snapshot": row.price,
+                    "qty": row.qty
+                })
+        return ndjson_lines(done)
+    
+    def finish(self) -> bytes:
+        return ndjson_lines([self.current] if self.current is not None else [])
+
+@router.get("/orders/export")
+async def export_orders(
+    request: Request,
+    fmt: str = FORMAT_QUERY,
+    current_user: Principal = Depends(get_current_user)
+):
+    """Stream the current user's order history, newest first.
+    
+    NDJSON has one order (with items) per line; CSV has one row per order item.
+    """
+    stmt = (
+        select(
+            Order.id.label("order_id"),
+            Order.created_at,
+            Order.total,
+            OrderItem.id.label("item_id"),
+            OrderItem.listing_id,
+            OrderItem.title_snapshot.label("title"),
+            OrderItem.price_snapshot.label("price"),
+            OrderItem.qty
+        )
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .where(Order.user_id == current_user.id)
+        .order_by(Order.created_at.desc(), Order.id.desc(), OrderItem.id)
+    )
+    
+    if fmt == "csv":
+        body = stream_rows(
+            read_sessionmaker(request),
+            stmt,
+            csv_lines,
+            header=csv_lines([ORDER_ITEM_COLUMNS])
+        )
+    else:
+        grouper = OrderGrouper()
+        body = stream_rows(read_sessionmaker(request), stmt, grouper.encode, finish=grouper.finish)
+    
+    return StreamingResponse(body, media_type=MEDIA_TYPES[fmt], headers=export_headers(fmt, "orders"))
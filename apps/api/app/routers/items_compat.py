@@ -1,39 +1,53 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.db import get_session
-from app.models import Listing, User, Order, OrderItem
-from app.schemas import ListingCreate, ListingOut
-from app.auth import get_current_user
+from app.replicas import get_read_session
+from app.models import LISTING_OUT_COLUMNS, Listing, Order, OrderItem
+from app.schemas import ListingCreate, ListingOut, ListingPage
+from app.auth import Principal, get_current_user
+from app.cache import cached_json_response
+from app.idempotency import Idempotency
+from app.jobs import enqueue
+from app.response_cache import RESPONSE_CACHE_MAX_AGE, invalidate_listing_caches, response_cache
+from app.routers.listings import fetch_listing_page, load_listing_out
+from app.serialization import FastJSONResponse
+from app.tasks import job_queue
+from app.reservations import claim_listings
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter()
 
-@router.get("/items", response_model=List[ListingOut])
-async def get_items(session: AsyncSession = Depends(get_session)):
-    """Get all items (compatibility endpoint for /listings)."""
-    result = await session.execute(select(Listing))
-    listings = result.scalars().all()
-    return listings
+@router.get("/items", response_model=ListingPage)
+async def get_items(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Get items newest first (compatibility endpoint for /listings)."""
+    page = await fetch_listing_page(session, select(*LISTING_OUT_COLUMNS).where(Listing.is_available), cursor, limit)
+    return FastJSONResponse(page)
 
 @router.get("/items/{item_id}", response_model=ListingOut)
 async def get_item(
     item_id: int,
+    request: Request,
     session: AsyncSession = Depends(get_session)
 ):
     """Get a specific item by ID (compatibility endpoint for /listings/{id})."""
-    result = await session.execute(select(Listing).where(Listing.id == item_id))
-    listing = result.scalar_one_or_none()
-    
-    if not listing:
-        raise HTTPException(status_code=404, detail="Item not found")
-    
-    return listing
+    # Shares cache entries with /listings/{id}
+    cached = await response_cache.get_or_load(
+        "listings",
+        {"id": item_id},
+        lambda: load_listing_out(session, item_id, "Item not found")
+    )
+    return cached_json_response(request, cached, RESPONSE_CACHE_MAX_AGE)
 
 @router.post("/items", response_model=ListingOut)
 async def create_item(
     item_data: ListingCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
     """Create a new item (compatibility endpoint for /listings)."""
@@ -48,26 +62,44 @@ async def create_item(
     session.add(listing)
     await session.commit()
     await session.refresh(listing)
+    await invalidate_listing_caches()
     
     return listing
 
-@router.get("/items/user/{user_id}", response_model=List[ListingOut])
+@router.get("/items/user/{user_id}", response_model=ListingPage)
 async def get_user_items(
     user_id: int,
-    session: AsyncSession = Depends(get_session)
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    """Get all items by a specific user."""
-    result = await session.execute(select(Listing).where(Listing.owner_id == user_id))
-    listings = result.scalars().all()
-    return listings
+    """Get items by a specific user, newest first."""
+    page = await fetch_listing_page(
+        session,
+        select(*LISTING_OUT_COLUMNS).where(Listing.owner_id == user_id, Listing.is_available),
+        cursor,
+        limit
+    )
+    return FastJSONResponse(page)
 
 @router.post("/items/{item_id}/purchase")
 async def purchase_item(
     item_id: int,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
-    """Purchase an item directly (creates a single-item order)."""
+    """Purchase an item directly (creates a single-item order).
+    
+    The item is claimed with a conditional UPDATE, so of several concurrent
+    buyers exactly one succeeds and the rest get 409. Retries with the same
+    Idempotency-Key get the first response back.
+    """
+    idempotency = await Idempotency.from_request(request, current_user.id)
+    replayed = await idempotency.replay(session)
+    if replayed is not None:
+        return replayed
+    
     # Get the item
     result = await session.execute(select(Listing).where(Listing.id == item_id))
     listing = result.scalar_one_or_none()
@@ -78,6 +110,9 @@ async def purchase_item(
     if listing.owner_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot purchase your own item")
     
+    if not await claim_listings(session, current_user.id, [listing.id]):
+        raise HTTPException(status_code=409, detail="Item is no longer available")
+    
     # Create order
     order = Order(user_id=current_user.id, total=listing.price)
     session.add(order)
@@ -93,13 +128,15 @@ async def purchase_item(
     )
     session.add(order_item)
     
-    await session.commit()
-    await session.refresh(order)
-    await session.refresh(order_item)
+    await enqueue(session, "order_placed", {"order_id": order.id})
     
-    return {
+    response = await idempotency.commit(session, {
         "message": "Purchase successful",
         "order_id": order.id,
         "item": listing.title,
         "total": order.total
-    }
\ No newline at end of file
+    })
+    job_queue.wake()
+    await invalidate_listing_caches()
+    
+    return response
\ No newline at end of file
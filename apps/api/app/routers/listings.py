@@ -1,51 +1,87 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.db import get_session
-from app.models import Listing, User
-from app.schemas import ListingCreate, ListingOut
-from app.auth import get_current_user
+from app.db import engine, get_session
+from app.models import LISTING_OUT_COLUMNS, Listing
+from app.schemas import ListingCreate, ListingOut, ListingPage
+from app.auth import Principal, get_current_user
+from app.cache import cached_json_response
+from app.response_cache import RESPONSE_CACHE_MAX_AGE, invalidate_listing_caches, response_cache
+from app.search import apply_search, tokenize
+from app.bulk_import import detect_format, import_listings, iter_lines, iter_records
+from app.serialization import row_serializer
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, page_slice
 
 router = APIRouter()
 
-@router.get("/listings", response_model=List[ListingOut])
+listing_row = row_serializer(LISTING_OUT_COLUMNS)
+
+async def fetch_listing_page(session: AsyncSession, query, cursor: Optional[str], limit: int) -> dict:
+    """Run a column-only listings query as a newest-first page ({items, next_cursor})."""
+    query = paginate(query, [Listing.created_at, Listing.id], cursor, limit)
+    rows, next_cursor = page_slice((await session.execute(query)).all(), limit, lambda row: (row.created_at, row.id))
+    return {"items": [listing_row(row) for row in rows], "next_cursor": next_cursor}
+
+@router.get("/listings", response_model=ListingPage)
 async def get_listings(
+    request: Request,
     q: Optional[str] = Query(None, description="Search query"),
     category: Optional[str] = Query(None, description="Filter by category"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     session: AsyncSession = Depends(get_session)
 ):
-    """Get all listings with optional search and category filter."""
-    query = select(Listing)
+    """Get listings with optional search and category filter, newest (or most relevant) first."""
+    async def load():
+        # Sold listings stay reachable by id but leave the feeds
+        query, rank = apply_search(
+            select(*LISTING_OUT_COLUMNS).where(Listing.is_available), Listing, q, session.bind.dialect.name
+        )
+        
+        if category:
+            query = query.where(Listing.category == category)
+        
+        if rank is not None:
+            # Ranked search pages on (rank, id) so the cursor stays stable
+            query = paginate(query.add_columns(rank), [rank, Listing.id], cursor, limit)
+            rows, next_cursor = page_slice((await session.execute(query)).all(), limit, lambda row: (row[-1], row.id))
+            return {"items": [listing_row(row) for row in rows], "next_cursor": next_cursor}
+        
+        return await fetch_listing_page(session, query, cursor, limit)
     
-    if q:
-        query = query.where(Listing.title.ilike(f"%{q}%"))
+    params = {"q": " ".join(tokenize(q or "")) or None, "category": category, "cursor": cursor, "limit": limit}
+    cached = await response_cache.get_or_load("listings", params, load)
+    return cached_json_response(request, cached, RESPONSE_CACHE_MAX_AGE)
+
+async def load_listing_out(session: AsyncSession, listing_id: int, not_found: str) -> ListingOut:
+    """Fetch one listing as ListingOut, raising 404 with not_found."""
+    result = await session.execute(select(Listing).where(Listing.id == listing_id))
+    listing = result.scalar_one_or_none()
     
-    if category:
-        query = query.where(Listing.category == category)
+    if not listing:
+        raise HTTPException(status_code=404, detail=not_found)
     
-    result = await session.execute(query)
-    listings = result.scalars().all()
-    return listings
+    return ListingOut.model_validate(listing)
 
 @router.get("/listings/{listing_id}", response_model=ListingOut)
 async def get_listing(
     listing_id: int,
+    request: Request,
     session: AsyncSession = Depends(get_session)
 ):
     """Get a specific listing by ID."""
-    result = await session.execute(select(Listing).where(Listing.id == listing_id))
-    listing = result.scalar_one_or_none()
-    
-    if not listing:
-        raise HTTPException(status_code=404, detail="Listing not found")
-    
-    return listing
+    cached = await response_cache.get_or_load(
+        "listings",
+        {"id": listing_id},
+        lambda: load_listing_out(session, listing_id, "Listing not found")
+    )
+    return cached_json_response(request, cached, RESPONSE_CACHE_MAX_AGE)
 
 @router.post("/listings", response_model=ListingOut)
 async def create_listing(
     listing_data: ListingCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
     """Create a new listing (authentication required)."""
@@ -60,5 +96,26 @@ async def create_listing(
     session.add(listing)
     await session.commit()
     await session.refresh(listing)
+    await invalidate_listing_caches()
+    
+    return listing
+
+@router.post("/listings/bulk")
+async def bulk_create_listings(
+    request: Request,
+    fmt: Optional[str] = Query(None, alias="format", pattern="^(csv|jsonl)$", description="Defaults from Content-Type"),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Stream-import listings from a CSV (with header row) or JSONL request body.
+    
+    Rows are validated like POST /listings and inserted in batches; invalid rows
+    are reported by line number and skipped.
+    """
+    fmt = fmt or detect_format(request.headers.get("content-type", ""))
+    records = iter_records(iter_lines(request.stream()), fmt)
+    report = await import_listings(engine, current_user.id, records)
+    
+    if report.inserted:
+        await invalidate_listing_caches()
     
-    return listing
\ No newline at end of file
+    return report.as_dict()
\ No newline at end of file
@@ -0,0 +1,33 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.replicas import get_read_session
+from app.models import NOTIFICATION_OUT_COLUMNS, Notification
+from app.schemas import NotificationPage
+from app.auth import Principal, get_current_user
+from app.serialization import FastJSONResponse, row_serializer
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, page_slice
+
+router = APIRouter()
+
+notification_row = row_serializer(NOTIFICATION_OUT_COLUMNS)
+
+@router.get("/notifications", response_model=NotificationPage)
+async def get_my_notifications(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: Principal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Get current user's notifications, newest first."""
+    query = paginate(
+        select(*NOTIFICATION_OUT_COLUMNS).where(Notification.user_id == current_user.id),
+        [Notification.id],
+        cursor,
+        limit
+    )
+    result = await session.execute(query)
+    rows, next_cursor = page_slice(result.all(), limit, lambda row: (row.id,))
+    
+    return FastJSONResponse({"items": [notification_row(row) for row in rows], "next_cursor": next_cursor})
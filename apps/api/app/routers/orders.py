@@ -1,67 +1,113 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, delete
 from app.db import get_session
-from app.models import Order, OrderItem, CartItem, Listing, User
-from app.schemas import OrderOut
-from app.auth import get_current_user
+from app.replicas import get_read_session
+from app.models import ORDER_ITEM_OUT_COLUMNS, ORDER_OUT_COLUMNS, Order, OrderItem, CartItem, Listing
+from app.schemas import OrderOut, OrderPage
+from app.auth import Principal, get_current_user
+from app.cart_summary import adjust_cart_summary
+from app.idempotency import Idempotency
+from app.jobs import enqueue
+from app.reservations import claim_listings
+from app.response_cache import invalidate_listing_caches
+from app.serialization import FastJSONResponse, row_serializer
+from app.tasks import job_queue
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, page_slice
 
 router = APIRouter()
 
+order_row = row_serializer(ORDER_OUT_COLUMNS)
+order_item_row = row_serializer(ORDER_ITEM_OUT_COLUMNS)
+
 @router.post("/orders/checkout", response_model=OrderOut)
 async def checkout(
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
-    """Create order from cart items and clear cart."""
-    # Get cart items
-    result = await session.execute(
-        select(CartItem, Listing)
-        .join(Listing)
-        .where(CartItem.user_id == current_user.id)
-    )
-    cart_data = result.all()
+    """Create order from cart items and clear cart.
+    
+    Every listing in the cart is claimed (marked sold) with one conditional
+    UPDATE first; if any was sold or is held by another cart, nothing is
+    ordered and the response is 409. The claimed lines are then deleted from
+    the cart with RETURNING and the order is built from exactly those rows,
+    in a fixed number of statements regardless of cart size.
     
-    if not cart_data:
+    With an Idempotency-Key header, a retry gets the first response back
+    instead of a second order (see app.idempotency).
+    """
+    idempotency = await Idempotency.from_request(request, current_user.id)
+    replayed = await idempotency.replay(session)
+    if replayed is not None:
+        return replayed
+    
+    result = await session.execute(select(CartItem.listing_id).where(CartItem.user_id == current_user.id))
+    listing_ids = set(result.scalars())
+    
+    if not listing_ids:
         raise HTTPException(status_code=400, detail="Cart is empty")
     
-    # Calculate total
-    total = sum(cart_item.unit_price * cart_item.qty for cart_item, _ in cart_data)
-    
-    # Create order
-    order = Order(user_id=current_user.id, total=total)
-    session.add(order)
-    await session.flush()  # Get order ID
-    
-    # Create order items
-    order_items = []
-    for cart_item, listing in cart_data:
-        order_item = OrderItem(
-            order_id=order.id,
-            listing_id=cart_item.listing_id,
-            title_snapshot=listing.title,
-            price_snapshot=cart_item.unit_price,
-            qty=cart_item.qty
+    unavailable = sorted(listing_ids - await claim_listings(session, current_user.id, listing_ids))
+    if unavailable:
+        await session.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=f"Listing not available: {', '.join(str(listing_id) for listing_id in unavailable)}"
         )
-        session.add(order_item)
-        order_items.append(order_item)
     
-    # Clear cart
-    for cart_item, _ in cart_data:
-        await session.delete(cart_item)
+    # Take the claimed lines out of the cart first; exactly the rows deleted are ordered,
+    # so lines added meanwhile stay in the cart and lines removed meanwhile are not ordered
+    title = select(Listing.title).where(Listing.id == CartItem.listing_id).scalar_subquery()
+    result = await session.execute(
+        delete(CartItem)
+        .where(CartItem.user_id == current_user.id, CartItem.listing_id.in_(listing_ids))
+        .returning(CartItem.listing_id, title.label("title"), CartItem.unit_price, CartItem.qty)
+    )
+    lines = result.all()
+    
+    if not lines:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail="Cart is empty")
+    
+    total = sum(line.unit_price * line.qty for line in lines)
+    result = await session.execute(
+        insert(Order)
+        .values(user_id=current_user.id, total=total)
+        .returning(Order.id, Order.user_id, Order.total, Order.created_at)
+    )
+    order = result.first()
     
-    await session.commit()
-    await session.refresh(order)
+    # All order items with their title snapshots in one multi-row insert
+    result = await session.execute(
+        insert(OrderItem)
+        .values([
+            {
+                "order_id": order.id,
+                "listing_id": line.listing_id,
+                "title_snapshot": line.title,
+                "price_snapshot": line.unit_price,
+                "qty": line.qty
+            }
+            for line in lines
+        ])
+        .returning(OrderItem.id, OrderItem.listing_id, OrderItem.title_snapshot, OrderItem.price_snapshot, OrderItem.qty)
+    )
+    order_items = result.all()
     
-    # Refresh order items
-    for item in order_items:
-        await session.refresh(item)
+    await session.execute(adjust_cart_summary(
+        session.bind.dialect.name,
+        current_user.id,
+        -len(lines),
+        -sum(line.qty for line in lines),
+        -total
+    ))
     
-    return OrderOut(
+    response = OrderOut(
         id=order.id,
         user_id=order.user_id,
-        total=order.total,
+        total=total,
         created_at=order.created_at,
         items=[
             {
@@ -74,41 +120,46 @@ async def checkout(
             for item in order_items
         ]
     )
+    
+    # Seller notifications and other side effects run after the response (see app.tasks)
+    await enqueue(session, "order_placed", {"order_id": order.id})
+    
+    await idempotency.commit(session, response)
+    job_queue.wake()
+    await invalidate_listing_caches()
+    
+    return response
 
-@router.get("/orders/mine", response_model=List[OrderOut])
+@router.get("/orders/mine", response_model=OrderPage)
 async def get_my_orders(
-    current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: Principal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    """Get current user's orders."""
-    result = await session.execute(
-        select(Order).where(Order.user_id == current_user.id).order_by(Order.created_at.desc())
+    """Get current user's orders, newest first."""
+    # Two column-only statements per page: the orders, then all of their items in one IN query
+    query = paginate(
+        select(*ORDER_OUT_COLUMNS).where(Order.user_id == current_user.id),
+        [Order.created_at, Order.id],
+        cursor,
+        limit
     )
-    orders = result.scalars().all()
+    result = await session.execute(query)
+    rows, next_cursor = page_slice(result.all(), limit, lambda row: (row.created_at, row.id))
+    orders = [order_row(row) for row in rows]
     
-    # Get order items for each order
-    orders_with_items = []
-    for order in orders:
-        items_result = await session.execute(
-            select(OrderItem).where(OrderItem.order_id == order.id)
+    items_by_order = {order["id"]: [] for order in orders}
+    if items_by_order:
+        result = await session.execute(
+            select(*ORDER_ITEM_OUT_COLUMNS, OrderItem.order_id)
+            .where(OrderItem.order_id.in_(items_by_order))
+            .order_by(OrderItem.id)
         )
-        items = items_result.scalars().all()
-        
-        orders_with_items.append(OrderOut(
-            id=order.id,
-            user_id=order.user_id,
-            total=order.total,
-            created_at=order.created_at,
-            items=[
-                {
-                    "id": item.id,
-                    "listing_id": item.listing_id,
-                    "title_snapshot": item.title_snapshot,
-                    "price_snapshot": item.price_snapshot,
-                    "qty": item.qty
-                }
-                for item in items
-            ]
-        ))
-    
-    return orders_with_items
\ No newline at end of file
+        for row in result:
+            items_by_order[row.order_id].append(order_item_row(row))
+    
+    for order in orders:
+        order["items"] = items_by_order[order["id"]]
+    
+    return FastJSONResponse({"items": orders, "next_cursor": next_cursor})
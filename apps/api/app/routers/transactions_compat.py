@@ -1,34 +1,36 @@
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends
+from typing import Dict, Any, Optional
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.db import get_session
-from app.models import Order, OrderItem, User
-from app.auth import get_current_user
+from sqlalchemy.orm import selectinload
+from app.replicas import get_read_session
+from app.models import Order
+from app.auth import Principal, get_current_user
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, page_slice
 
 router = APIRouter()
 
-@router.get("/transactions", response_model=List[Dict[str, Any]])
+@router.get("/transactions", response_model=Dict[str, Any])
 async def get_transactions(
-    current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: Principal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    """Get user's transaction history (orders with item details)."""
-    # Get user's orders
-    orders_result = await session.execute(
-        select(Order).where(Order.user_id == current_user.id).order_by(Order.created_at.desc())
+    """Get user's transaction history (orders with item details), newest first."""
+    # Orders and their items load in two statements regardless of page size
+    query = paginate(
+        select(Order).where(Order.user_id == current_user.id).options(selectinload(Order.items)),
+        [Order.created_at, Order.id],
+        cursor,
+        limit
     )
-    orders = orders_result.scalars().all()
+    orders_result = await session.execute(query)
+    orders, next_cursor = page_slice(orders_result.scalars().all(), limit, lambda order: (order.created_at, order.id))
     
     transactions = []
     
     for order in orders:
-        # Get order items for this order
-        items_result = await session.execute(
-            select(OrderItem).where(OrderItem.order_id == order.id)
-        )
-        order_items = items_result.scalars().all()
-        
         transaction = {
             "id": order.id,
             "total": float(order.total),
@@ -41,9 +43,9 @@ async def get_transactions(
                     "qty": item.qty,
                     "line_total": float(item.price_snapshot * item.qty)
                 }
-                for item in order_items
+                for item in order.items
             ]
         }
         transactions.append(transaction)
     
-    return transactions
\ No newline at end of file
+    return {"items": transactions, "next_cursor": next_cursor}
\ No newline at end of file
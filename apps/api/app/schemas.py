@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 # User schemas
@@ -49,18 +49,31 @@ class ListingOut(BaseModel):
     price: float
     owner_id: Optional[int]
     created_at: datetime
+    is_available: bool = True
     
     class Config:
         from_attributes = True
 
+class ListingPage(BaseModel):
+    items: List[ListingOut]
+    next_cursor: Optional[str] = None
+
 # Cart schemas
 class CartItemCreate(BaseModel):
     listing_id: int
-    qty: int
+    qty: int = 1  # deprecated: a line always holds one unit of its listing
 
 class CartItemUpdate(BaseModel):
     qty: int
 
+class CartOperation(BaseModel):
+    op: Literal["add", "update", "remove"]
+    listing_id: int
+    qty: Optional[int] = None
+
+class CartBatch(BaseModel):
+    operations: List[CartOperation]
+
 class CartItemOut(BaseModel):
     id: int
     listing_id: int
@@ -76,6 +89,14 @@ class CartOut(BaseModel):
     items: List[CartItemOut]
     subtotal: float
 
+class CartSummaryOut(BaseModel):
+    line_count: int
+    item_count: int
+    subtotal: float
+    
+    class Config:
+        from_attributes = True
+
 # Order schemas
 class OrderItemOut(BaseModel):
     id: int
@@ -96,4 +117,23 @@ class OrderOut(BaseModel):
     
     class Config:
         from_attributes = True
-        
\ No newline at end of file
+        
+
+class OrderPage(BaseModel):
+    items: List[OrderOut]
+    next_cursor: Optional[str] = None
+
+# Notification schemas
+class NotificationOut(BaseModel):
+    id: int
+    kind: str
+    message: str
+    order_id: Optional[int] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class NotificationPage(BaseModel):
+    items: List[NotificationOut]
+    next_cursor: Optional[str] = None
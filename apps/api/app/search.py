@@ -0,0 +1,94 @@
+import re
+from typing import List, Optional, Tuple
+from sqlalchemy import column, func, literal_column, or_, table, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Full-text search over listing title + description.
+#
+# PostgreSQL: GIN expression index over a tsvector, queried with prefix tsquery
+# terms and ranked with ts_rank_cd.
+# SQLite: FTS5 external-content table kept in sync by triggers, ranked by bm25.
+# Anything else falls back to ILIKE.
+
+MAX_SEARCH_TERMS = 8
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# The WHERE clause must use exactly this expression for the planner to pick the index
+_PG_VECTOR_SQL = "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, ''))"
+
+_POSTGRES_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_listings_search ON listings USING GIN ({_PG_VECTOR_SQL})",
+]
+
+_SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5(
+        title, description, content='listings', content_rowid='id'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS listings_fts_ai AFTER INSERT ON listings BEGIN
+        INSERT INTO listings_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS listings_fts_ad AFTER DELETE ON listings BEGIN
+        INSERT INTO listings_fts(listings_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS listings_fts_au AFTER UPDATE OF title, description ON listings BEGIN
+        INSERT INTO listings_fts(listings_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO listings_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+listings_fts = table("listings_fts", column("rowid"))
+
+def tokenize(q: str) -> List[str]:
+    """Split a raw search string into lowercase word terms."""
+    return [token.lower() for token in _TOKEN_RE.findall(q)][:MAX_SEARCH_TERMS]
+
+async def ensure_search_index(conn: AsyncConnection):
+    """Create the search index for the connected backend (idempotent)."""
+    dialect = conn.dialect.name
+
+    if dialect == "postgresql":
+        for ddl in _POSTGRES_DDL:
+            await conn.execute(text(ddl))
+    elif dialect == "sqlite":
+        result = await conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'listings_fts'")
+        )
+        exists = result.scalar() is not None
+
+        for ddl in _SQLITE_DDL:
+            await conn.execute(text(ddl))
+
+        # Index rows that were inserted before the FTS table existed
+        if not exists:
+            await conn.execute(text("INSERT INTO listings_fts(listings_fts) VALUES ('rebuild')"))
+
+def apply_search(stmt, model, q: Optional[str], dialect: str) -> Tuple[object, Optional[object]]:
+    """Filter a listings query by search text.
+
+    Returns the filtered statement and a relevance expression (higher is
+    better), or None when results cannot be ranked.
+    """
+    terms = tokenize(q or "")
+    if not terms:
+        return stmt, None
+
+    if dialect == "postgresql":
+        vector = literal_column(_PG_VECTOR_SQL)
+        query = func.to_tsquery(literal_column("'english'"), " & ".join(f"{term}:*" for term in terms))
+        stmt = stmt.where(vector.op("@@")(query))
+        return stmt, func.ts_rank_cd(vector, query)
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        stmt = stmt.join(listings_fts, listings_fts.c.rowid == model.id).where(
+            literal_column("listings_fts").op("MATCH")(match)
+        )
+        # bm25() is lower-is-better
+        return stmt, -func.bm25(literal_column("listings_fts"))
+
+    for term in terms:
+        stmt = stmt.where(or_(model.title.ilike(f"%{term}%"), model.description.ilike(f"%{term}%")))
+    return stmt, None
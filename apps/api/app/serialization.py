@@ -0,0 +1,51 @@
+import json
+from typing import Any, Callable, Sequence
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from pydantic import BaseModel
+from app.config import env_flag
+
+try:
+    import orjson
+except ImportError:  # optional dependency, FAST_JSON falls back to json
+    orjson = None
+
+# Fast path for list responses.
+#
+# List endpoints select plain columns instead of ORM entities and turn rows
+# into dicts with a serializer compiled once per column set, skipping ORM
+# identity-map work and per-row Pydantic validation. With FAST_JSON=true (and
+# orjson installed) bodies are encoded by orjson instead of the json module.
+
+FAST_JSON = env_flag("FAST_JSON", False) and orjson is not None
+
+def _orjson_default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(data: Any) -> bytes:
+    """Encode data (dicts, lists, Pydantic models, datetimes) as compact JSON."""
+    if FAST_JSON:
+        return orjson.dumps(data, default=_orjson_default)
+    return json.dumps(jsonable_encoder(data), separators=(",", ":")).encode()
+
+class FastJSONResponse(Response):
+    """JSON response encoded with dumps()."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def row_serializer(columns: Sequence) -> Callable[[Any], dict]:
+    """Compile a row -> dict converter for a select whose leading columns are columns.
+
+    Extra trailing columns (e.g. a search rank) are ignored.
+    """
+    names = tuple(column.key for column in columns)
+
+    def serialize(row) -> dict:
+        return dict(zip(names, row))
+
+    return serialize
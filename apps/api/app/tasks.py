@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Any, Dict
+from sqlalchemy import insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.db import engine
+from app.jobs import JobQueue
+from app.models import Notification, OrderItem, Listing
+
+# Background jobs of the main app. Routes enqueue them with app.jobs.enqueue
+# in the order's transaction and call job_queue.wake() after committing.
+
+job_queue = JobQueue(engine)
+
+@job_queue.handler("order_placed")
+async def notify_sellers(conn: AsyncConnection, payload: Dict[str, Any]):
+    """Tell the seller of every listing in an order that it sold."""
+    await conn.execute(
+        insert(Notification).from_select(
+            [Notification.user_id, Notification.kind, Notification.message, Notification.order_id, Notification.created_at],
+            select(
+                Listing.owner_id,
+                literal("sale"),
+                literal("Your listing sold: ") + OrderItem.title_snapshot,
+                OrderItem.order_id,
+                literal(datetime.utcnow()),
+            )
+            .join(Listing, Listing.id == OrderItem.listing_id)
+            .where(OrderItem.order_id == payload["order_id"], Listing.owner_id.is_not(None))
+        )
+    )
@@ -0,0 +1,242 @@
+"""HTTP load profile for search, cart, checkout and order-history flows.
+
+Run from apps/api. By default the app.main ASGI app runs in-process against
+--database-url (seeded first, see bench/seed.py); --base-url targets a
+running server instead (seed its database with bench/seed.py beforehand):
+
+    python bench/load.py --database-url sqlite+aiosqlite:///./bench.db --duration 30
+    python bench/load.py --base-url http://localhost:8000 --concurrency 64
+    python bench/load.py ... --output run.json --baseline main.json --max-regression 0.2
+
+Each virtual user logs in as its own bench user and loops over the flows.
+Listings are one of a kind and carts hold them, so every cart and checkout
+flow takes listings no other virtual user has been given (a shared pool that
+pages through the available-listings feed); a long run needs enough seeded
+listings. Rerunning against the same database within CART_HOLD_SECONDS of an
+earlier run can still meet that run's holds, so reseed or run the server
+with a short hold.
+
+Reports count, errors, p50/p95/p99 (ms) and requests/s per operation; the
+latencies and counts are of successful calls only. The run fails (exit 1)
+when an operation's error rate exceeds --max-error-rate, and with --baseline
+when an operation's p95 regresses by more than --max-regression.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed import BENCH_PASSWORD, add_arguments, bench_email, prepare, search_terms
+
+FLOWS = ("search", "cart", "checkout", "history")
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        # Errors are often fast rejections, so they would flatter the percentiles
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        else:
+            self.latencies[name].append(time.perf_counter() - started)
+        return response
+
+class ListingPool:
+    """Hands out each available listing once, paging through the newest-first feed."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.listing_ids = []
+        self.cursor = None
+        self.exhausted = False
+        self.lock = asyncio.Lock()
+
+    async def take(self, count: int) -> list:
+        async with self.lock:
+            while len(self.listing_ids) < count and not self.exhausted:
+                response = await self.client.get("/listings", params={"limit": 100, "cursor": self.cursor})
+                response.raise_for_status()
+                page = response.json()
+                self.listing_ids.extend(listing["id"] for listing in page["items"])
+                self.cursor = page["next_cursor"]
+                self.exhausted = self.cursor is None
+            if len(self.listing_ids) < count:
+                raise RuntimeError("Ran out of available listings; reseed or seed more --listings")
+            taken, self.listing_ids = self.listing_ids[:count], self.listing_ids[count:]
+            return taken
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+async def search_flow(client, recorder, rng, headers):
+    term = rng.choice(search_terms())
+    response = await recorder.call(client, "search", "GET", "/listings", params={"q": term, "limit": 20})
+    next_cursor = response.json().get("next_cursor") if response.status_code == 200 else None
+    if next_cursor:
+        await recorder.call(
+            client, "search page 2", "GET", "/listings",
+            params={"q": term, "limit": 20, "cursor": next_cursor}
+        )
+
+async def cart_flow(client, recorder, headers, pool):
+    [listing_id] = await pool.take(1)
+    response = await recorder.call(
+        client, "cart add", "POST", "/cart/items", json={"listing_id": listing_id}, headers=headers
+    )
+    await recorder.call(client, "cart summary", "GET", "/cart/summary", headers=headers)
+    await recorder.call(client, "cart view", "GET", "/cart", headers=headers)
+    if response.status_code == 200:
+        # Keeps the cart small and leaves checkout to buy only its own listings
+        await recorder.call(client, "cart remove", "DELETE", f"/cart/items/{response.json()['id']}", headers=headers)
+
+async def checkout_flow(client, recorder, headers, pool):
+    await recorder.call(
+        client, "cart batch", "PATCH", "/cart",
+        json={"operations": [{"op": "add", "listing_id": listing_id} for listing_id in await pool.take(3)]},
+        headers=headers
+    )
+    await recorder.call(client, "checkout", "POST", "/orders/checkout", headers=headers)
+
+async def history_flow(client, recorder, rng, headers):
+    response = await recorder.call(client, "orders", "GET", "/orders/mine", params={"limit": 20}, headers=headers)
+    for _ in range(2):
+        next_cursor = response.json().get("next_cursor") if response.status_code == 200 else None
+        if not next_cursor:
+            break
+        response = await recorder.call(
+            client, "orders next page", "GET", "/orders/mine",
+            params={"limit": 20, "cursor": next_cursor}, headers=headers
+        )
+
+async def virtual_user(client, recorder, index: int, flows, pool, deadline: float):
+    rng = random.Random(index)
+    response = await client.post("/auth/login", json={"email": bench_email(index), "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    while time.perf_counter() < deadline:
+        flow = rng.choice(flows)
+        if flow == "search":
+            await search_flow(client, recorder, rng, headers)
+        elif flow == "cart":
+            await cart_flow(client, recorder, headers, pool)
+        elif flow == "checkout":
+            await checkout_flow(client, recorder, headers, pool)
+        else:
+            await history_flow(client, recorder, rng, headers)
+
+def report(recorder: Recorder, elapsed: float) -> dict:
+    results = {}
+    for name in sorted(set(recorder.latencies) | set(recorder.errors)):
+        latencies = sorted(recorder.latencies[name])
+        results[name] = {
+            "count": len(latencies),
+            "errors": recorder.errors[name],
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "rps": len(latencies) / elapsed,
+        }
+
+    print(f"{'operation':<20} {'count':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+    for name, row in results.items():
+        print(
+            f"{name:<20} {row['count']:>8} {row['errors']:>7} {row['p50_ms']:>9.1f} "
+            f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['rps']:>9.1f}"
+        )
+    total = sum(row["count"] for row in results.values())
+    print(f"{'total':<20} {total:>8} {'':>7} {'':>9} {'':>9} {'':>9} {total / elapsed:>9.1f}")
+    return results
+
+def error_rates(results: dict, max_error_rate: float) -> list:
+    """Operations whose share of failed calls exceeds max_error_rate."""
+    failed = []
+    for name, row in results.items():
+        rate = row["errors"] / (row["count"] + row["errors"])
+        if rate > max_error_rate:
+            failed.append(f"{name}: {row['errors']} of {row['count'] + row['errors']} calls failed ({rate:.1%})")
+    return failed
+
+def regressions(results: dict, baseline: dict, max_regression: float) -> list:
+    """Operations whose p95 grew by more than max_regression over the baseline."""
+    return [
+        f"{name}: p95 {row['p95_ms']:.1f} ms vs {baseline[name]['p95_ms']:.1f} ms"
+        for name, row in results.items()
+        if name in baseline and row["p95_ms"] > baseline[name]["p95_ms"] * (1 + max_regression)
+    ]
+
+async def run(args) -> dict:
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        os.environ["DATABASE_URL"] = args.database_url
+        await prepare(args)
+        from app.main import app
+
+        transport, base_url = httpx.ASGITransport(app=app), "http://bench"
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+        pool = ListingPool(client)
+        flows = args.flows.split(",")
+        started = time.perf_counter()
+        recorder = Recorder()
+        await asyncio.gather(*(
+            virtual_user(client, recorder, index, flows, pool, started + args.duration)
+            for index in range(args.concurrency)
+        ))
+        return report(recorder, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument("--base-url", help="target a running server instead of the in-process app")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users (each needs a bench user)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--flows", default=",".join(FLOWS), help=f"comma-separated subset of {','.join(FLOWS)}")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare p95 against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="per operation, as a fraction of calls")
+    args = parser.parse_args()
+
+    unknown = set(args.flows.split(",")) - set(FLOWS)
+    if unknown:
+        parser.error(f"unknown flows: {', '.join(sorted(unknown))}")
+
+    results = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+    failed = False
+    for line in error_rates(results, args.max_error_rate):
+        print(f"ERRORS {line}")
+        failed = True
+    if args.baseline:
+        with open(args.baseline) as handle:
+            for line in regressions(results, json.load(handle), args.max_regression):
+                print(f"REGRESSION {line}")
+                failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
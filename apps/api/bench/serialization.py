@@ -0,0 +1,90 @@
+"""Throughput of 1k-row listing responses: ORM + Pydantic vs column-only + fast JSON.
+
+Run from apps/api:
+
+    python bench/serialization.py [--rows 1000] [--seconds 3]
+
+Uses an in-memory SQLite database, so the numbers measure row materialization
+and encoding rather than network or server I/O.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app import serialization
+from app.db import Base
+from app.models import LISTING_OUT_COLUMNS, Listing, User
+from app.schemas import ListingOut, ListingPage
+from app.serialization import FastJSONResponse, row_serializer
+
+listing_row = row_serializer(LISTING_OUT_COLUMNS)
+
+async def orm_pydantic(session, rows: int) -> bytes:
+    result = await session.execute(select(Listing).order_by(Listing.id.desc()).limit(rows))
+    page = ListingPage(items=[ListingOut.model_validate(listing) for listing in result.scalars()], next_cursor=None)
+    session.expunge_all()
+    return JSONResponse(jsonable_encoder(page)).body
+
+async def columns_fast(session, rows: int) -> bytes:
+    result = await session.execute(select(*LISTING_OUT_COLUMNS).order_by(Listing.id.desc()).limit(rows))
+    return FastJSONResponse({"items": [listing_row(row) for row in result], "next_cursor": None}).body
+
+async def measure(sessionmaker, build, rows: int, seconds: float) -> float:
+    async with sessionmaker() as session:
+        await build(session, rows)  # warm up
+        done = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            await build(session, rows)
+            done += 1
+        return done / (time.perf_counter() - start)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"email": "bench@example.com", "username": "bench", "password_hash": "x"}])
+        now = datetime.utcnow()
+        await conn.execute(insert(Listing), [
+            {
+                "title": f"Listing {i}",
+                "description": "A reasonably sized description for a second-hand item " * 2,
+                "category": "bench",
+                "price": float(i),
+                "owner_id": 1,
+                "created_at": now,
+            }
+            for i in range(args.rows)
+        ])
+
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    cases = [("orm + pydantic + json", orm_pydantic, False), ("columns + json", columns_fast, False)]
+    if serialization.orjson is not None:
+        cases.append(("columns + orjson", columns_fast, True))
+
+    baseline = None
+    for name, build, fast in cases:
+        serialization.FAST_JSON = fast
+        rate = await measure(sessionmaker, build, args.rows, args.seconds)
+        baseline = baseline or rate
+        print(f"{name:<24} {rate:8.1f} responses/s  ({rate * args.rows:10.0f} rows/s, x{rate / baseline:.2f})")
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# The suite creates, seeds and writes data, so it never runs against an exported
+# DATABASE_URL: it uses TEST_DATABASE_URL if given, else a throwaway SQLite file.
+# app.db and friends read these at import time, hence before any app import.
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or (
+    "sqlite+aiosqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+)
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["RESPONSE_CACHE_URL"] = "memory://"
+os.environ["PUBSUB_URL"] = "memory://"
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def legacy_client(tmp_path):
+    """Client for the legacy app (main.py) on its own database; yields (client, sessionmaker).
+
+    Its tables share names with app.models', so it cannot use the suite's database.
+    """
+    import main as legacy
+    from app.idempotency import idempotency_metadata
+    from app.jobs import jobs_metadata
+
+    legacy_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+    async with legacy_engine.begin() as conn:
+        await conn.run_sync(legacy.Base.metadata.create_all)
+        await conn.run_sync(idempotency_metadata.create_all)
+        await conn.run_sync(jobs_metadata.create_all)
+    sessions = async_sessionmaker(legacy_engine, expire_on_commit=False)
+
+    async def get_session():
+        async with sessions() as session:
+            yield session
+
+    legacy.app.dependency_overrides[legacy.get_session] = get_session
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=legacy.app), base_url="http://test") as client:
+            yield client, sessions
+    finally:
+        legacy.app.dependency_overrides.clear()
+        await legacy_engine.dispose()
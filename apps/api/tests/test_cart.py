@@ -0,0 +1,97 @@
+"""Cart lines hold one unit of a listing; the qty fields are deprecated."""
+import time
+from contextlib import contextmanager
+
+import httpx
+import pytest
+from sqlalchemy import event, insert
+
+from app.auth import create_access_token
+from app.db import engine
+from app.main import app
+from app.migrations import run_migrations
+from app.models import Listing, User
+
+pytestmark = pytest.mark.anyio
+
+# Hold, line upsert and summary upsert, whether or not the line is new
+STATEMENTS_PER_ADD = 3
+
+async def create_buyer_and_listing() -> tuple:
+    """Insert a buyer and a listing owned by someone else; returns (bearer headers, listing id)."""
+    run = time.time_ns()
+    async with engine.begin() as conn:
+        seller_id, buyer_id = (await conn.execute(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [
+                {"email": f"seller-{run}@example.com", "username": "seller", "password_hash": "x"},
+                {"email": f"buyer-{run}@example.com", "username": "buyer", "password_hash": "x"},
+            ]
+        )).scalars().all()
+        listing_id = (await conn.execute(
+            insert(Listing).values(title="Lamp", description="", category="home", price=12.5, owner_id=seller_id)
+            .returning(Listing.id)
+        )).scalar_one()
+
+    token = create_access_token({"sub": str(buyer_id), "username": "buyer", "ver": 0})
+    return {"Authorization": f"Bearer {token}"}, listing_id
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+@pytest.fixture
+async def client():
+    await run_migrations(engine)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+async def test_adding_a_listing_twice_keeps_one_unit(client):
+    headers, listing_id = await create_buyer_and_listing()
+    # Loads the principal, so the adds below count only cart statements
+    assert (await client.get("/cart/summary", headers=headers)).status_code == 200
+
+    counts = []
+    for _ in range(2):
+        with count_statements() as statements:
+            response = await client.post("/cart/items", json={"listing_id": listing_id}, headers=headers)
+        assert response.status_code == 200
+        assert (response.json()["qty"], response.json()["line_total"]) == (1, 12.5)
+        counts.append(len(statements))
+
+    assert counts == [STATEMENTS_PER_ADD, STATEMENTS_PER_ADD]
+    summary = (await client.get("/cart/summary", headers=headers)).json()
+    assert (summary["line_count"], summary["item_count"], summary["subtotal"]) == (1, 1, 12.5)
+
+async def test_quantities_other_than_one_are_rejected(client):
+    headers, listing_id = await create_buyer_and_listing()
+
+    response = await client.post("/cart/items", json={"listing_id": listing_id, "qty": 2}, headers=headers)
+    assert response.status_code == 400
+
+    line = (await client.post("/cart/items", json={"listing_id": listing_id, "qty": 1}, headers=headers)).json()
+    response = await client.patch(f"/cart/items/{line['id']}", json={"qty": 3}, headers=headers)
+    assert response.status_code == 400
+    response = await client.patch(f"/cart/items/{line['id']}", json={"qty": 1}, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == line
+
+    response = await client.patch("/cart", json={"operations": [
+        {"op": "update", "listing_id": listing_id, "qty": 2}
+    ]}, headers=headers)
+    assert response.status_code == 400
+    summary = (await client.get("/cart/summary", headers=headers)).json()
+    assert (summary["line_count"], summary["item_count"]) == (1, 1)
+
+async def test_update_endpoint_is_marked_deprecated(client):
+    schema = (await client.get("/openapi.json")).json()
+    assert schema["paths"]["/cart/items/{item_id}"]["patch"]["deprecated"] is True
@@ -0,0 +1,138 @@
+"""Idempotency-Key on order creation: replays, reuse with another body, and per-user scoping."""
+import time
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import func, insert, select
+
+import main as legacy
+from app.auth import create_access_token
+from app.db import engine
+from app.main import app
+from app.migrations import run_migrations
+from app.models import Listing, Order, User
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def client():
+    await run_migrations(engine)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+async def create_buyers(count: int) -> tuple:
+    """Insert buyers and a listing for each; returns (bearer headers, listing ids)."""
+    run = time.time_ns()
+    async with engine.begin() as conn:
+        seller_id, *buyer_ids = (await conn.execute(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [
+                {"email": f"retry-{run}-{i}@example.com", "username": f"retry{i}", "password_hash": "x"}
+                for i in range(count + 1)
+            ]
+        )).scalars().all()
+        listing_ids = (await conn.execute(
+            insert(Listing).returning(Listing.id, sort_by_parameter_order=True),
+            [
+                {"title": f"Kettle {i}", "description": "", "category": "home", "price": 20.0, "owner_id": seller_id}
+                for i in range(count)
+            ]
+        )).scalars().all()
+
+    headers = [
+        {"Authorization": f"Bearer {create_access_token({'sub': str(buyer_id), 'username': 'retry', 'ver': 0})}"}
+        for buyer_id in buyer_ids
+    ]
+    return headers, listing_ids
+
+async def order_count(user_id: int) -> int:
+    async with engine.connect() as conn:
+        return await conn.scalar(select(func.count()).select_from(Order).where(Order.user_id == user_id))
+
+async def test_checkout_retry_replays_the_first_order(client):
+    [headers], [listing_id] = await create_buyers(1)
+    assert (await client.post("/cart/items", json={"listing_id": listing_id}, headers=headers)).status_code == 200
+    key = {"Idempotency-Key": str(uuid.uuid4())}
+
+    first = await client.post("/orders/checkout", headers={**headers, **key})
+    retry = await client.post("/orders/checkout", headers={**headers, **key})
+
+    assert first.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+    assert retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert await order_count(first.json()["user_id"]) == 1
+
+    # Without the key the retry is a new request, and the cart is empty by now
+    assert (await client.post("/orders/checkout", headers=headers)).status_code == 400
+
+async def test_checkout_key_reused_with_another_body_is_rejected(client):
+    [headers], [listing_id] = await create_buyers(1)
+    await client.post("/cart/items", json={"listing_id": listing_id}, headers=headers)
+    key = {"Idempotency-Key": str(uuid.uuid4())}
+
+    first = await client.post("/orders/checkout", headers={**headers, **key})
+    reused = await client.post("/orders/checkout", json={"note": "leave at the door"}, headers={**headers, **key})
+
+    assert first.status_code == 200
+    assert reused.status_code == 422
+    assert await order_count(first.json()["user_id"]) == 1
+
+async def test_checkout_keys_are_scoped_per_user(client):
+    headers, listing_ids = await create_buyers(2)
+    key = {"Idempotency-Key": str(uuid.uuid4())}
+    for user_headers, listing_id in zip(headers, listing_ids):
+        await client.post("/cart/items", json={"listing_id": listing_id}, headers=user_headers)
+
+    orders = [(await client.post("/orders/checkout", headers={**user_headers, **key})) for user_headers in headers]
+
+    assert [response.status_code for response in orders] == [200, 200]
+    assert "Idempotent-Replayed" not in orders[1].headers
+    assert orders[0].json()["id"] != orders[1].json()["id"]
+    assert orders[0].json()["user_id"] != orders[1].json()["user_id"]
+
+async def create_legacy_listing(sessions) -> int:
+    async with sessions() as session:
+        listing = legacy.Listing(title="Kettle", description="", category="home", price=20.0, seller_id=1)
+        session.add(listing)
+        await session.commit()
+        return listing.id
+
+def legacy_headers(user_id: int, key: str) -> dict:
+    return {"Authorization": f"Bearer {legacy.create_access_token({'sub': str(user_id)})}", "Idempotency-Key": key}
+
+def legacy_order(listing_id: int, address: str = "1 Main St") -> dict:
+    return {"items": [{"id": listing_id, "price": 20.0, "quantity": 1}], "shipping_address": address}
+
+async def test_legacy_order_retry_replays_the_first_order(legacy_client):
+    client, sessions = legacy_client
+    listing_id = await create_legacy_listing(sessions)
+    headers = legacy_headers(1, str(uuid.uuid4()))
+
+    first = await client.post("/orders", json=legacy_order(listing_id), headers=headers)
+    retry = await client.post("/orders", json=legacy_order(listing_id), headers=headers)
+    reused = await client.post("/orders", json=legacy_order(listing_id, "2 Side St"), headers=headers)
+
+    assert first.status_code == 200
+    assert (retry.status_code, retry.headers["Idempotent-Replayed"]) == (200, "true")
+    assert retry.json() == first.json()
+    assert reused.status_code == 422
+    async with sessions() as session:
+        assert await session.scalar(select(func.count()).select_from(legacy.Order)) == 1
+
+async def test_legacy_order_keys_are_scoped_per_user(legacy_client):
+    client, sessions = legacy_client
+    listing_id = await create_legacy_listing(sessions)
+    key = str(uuid.uuid4())
+
+    first = await client.post("/orders", json=legacy_order(listing_id), headers=legacy_headers(1, key))
+    # Another user's request with the same key and body runs for real: the listing is already sold
+    other = await client.post("/orders", json=legacy_order(listing_id), headers=legacy_headers(2, key))
+    # Without a Bearer token the key is ignored rather than shared between anonymous callers
+    anonymous = await client.post("/orders", json=legacy_order(listing_id), headers={"Idempotency-Key": key})
+
+    assert first.status_code == 200
+    assert other.status_code == 409
+    assert anonymous.status_code == 409
@@ -0,0 +1,93 @@
+"""Each hot router query must be served by an index after migrating.
+
+Runs against DATABASE_URL: EXPLAIN QUERY PLAN on SQLite (the default),
+EXPLAIN (FORMAT JSON) on PostgreSQL (with sequential scans disabled, since
+the planner prefers them on near-empty tables).
+"""
+import json
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import pytest
+from sqlalchemy import select
+
+from app.db import engine
+from app.migrations import run_migrations
+from app.models import (
+    LISTING_OUT_COLUMNS, ORDER_ITEM_OUT_COLUMNS, ORDER_OUT_COLUMNS, CartItem, Listing, Order, OrderItem,
+)
+from app.pagination import encode_cursor, paginate
+
+pytestmark = pytest.mark.anyio
+
+CURSOR = encode_cursor([datetime(2024, 1, 1), 100])
+
+# name -> (statement as the router builds it, indexes that may serve it)
+HOT_QUERIES = {
+    "listings by category": (
+        paginate(select(*LISTING_OUT_COLUMNS).where(Listing.is_available, Listing.category == "books"), [Listing.created_at, Listing.id], None, 20),
+        ("ix_listings_category_created_at_id",),
+    ),
+    "listings by owner_id": (
+        paginate(select(*LISTING_OUT_COLUMNS).where(Listing.owner_id == 1, Listing.is_available), [Listing.created_at, Listing.id], None, 20),
+        ("ix_listings_owner_created_at_id",),
+    ),
+    "listings created_at keyset": (
+        paginate(select(*LISTING_OUT_COLUMNS).where(Listing.is_available), [Listing.created_at, Listing.id], CURSOR, 20),
+        ("ix_listings_created_at_id",),
+    ),
+    "cart_items by user_id": (
+        select(CartItem).where(CartItem.user_id == 1),
+        # SQLite backs the unique constraint with an automatic index
+        ("uq_cart_items_user_listing", "sqlite_autoindex_cart_items_1"),
+    ),
+    "orders by user_id": (
+        paginate(select(*ORDER_OUT_COLUMNS).where(Order.user_id == 1), [Order.created_at, Order.id], CURSOR, 20),
+        ("ix_orders_user_created_at_id",),
+    ),
+    "order_items by order_id": (
+        select(*ORDER_ITEM_OUT_COLUMNS, OrderItem.order_id).where(OrderItem.order_id.in_([1, 2, 3])).order_by(OrderItem.id),
+        ("ix_order_items_order_id",),
+    ),
+}
+
+def _pg_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _pg_nodes(child)
+
+async def query_plan(conn, stmt) -> List[Tuple[bool, Optional[str]]]:
+    """(is a full scan, index used) for every step of the statement's plan."""
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+
+    if conn.dialect.name == "postgresql":
+        await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)
+        document = result.scalar()
+        plan = (json.loads(document) if isinstance(document, str) else document)[0]["Plan"]
+        return [(node["Node Type"] == "Seq Scan", node.get("Index Name")) for node in _pg_nodes(plan)]
+
+    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+    steps = []
+    for row in result:
+        detail = row[-1]
+        index = re.search(r"USING (?:COVERING )?INDEX (\S+)", detail)
+        steps.append((detail.startswith("SCAN"), index.group(1) if index else None))
+    return steps
+
+@pytest.fixture
+async def migrated():
+    await run_migrations(engine)
+    yield engine
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+async def test_hot_query_uses_index(migrated, name):
+    stmt, indexes = HOT_QUERIES[name]
+    # Closing without commit rolls back SET LOCAL
+    async with migrated.connect() as conn:
+        steps = await query_plan(conn, stmt)
+
+    assert not any(scan for scan, _ in steps), f"{name} scans: {steps}"
+    assert any(index in indexes for _, index in steps), f"{name} uses none of {indexes}: {steps}"
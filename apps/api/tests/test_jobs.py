@@ -0,0 +1,163 @@
+"""The outbox job queue: claim, retry, dead-letter and exactly-once completion."""
+import asyncio
+import itertools
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, func, insert, select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import jobs
+from app.db import SessionLocal, engine
+from app.jobs import JobQueue, enqueue, outbox
+from app.migrations import run_migrations
+
+pytestmark = pytest.mark.anyio
+
+# Rows written by test handlers, so side effects can be counted after a rollback
+effects_metadata = MetaData()
+effects = Table(
+    "test_job_effects",
+    effects_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("kind", String(100), nullable=False),
+)
+
+_kinds = itertools.count()
+
+@pytest.fixture
+async def queue(monkeypatch):
+    """A JobQueue on the test database whose retries are due immediately."""
+    monkeypatch.setattr(jobs, "JOB_RETRY_BASE_SECONDS", 0)
+    await run_migrations(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(effects_metadata.create_all)
+    return JobQueue(engine, workers=2)
+
+def unique_kind(name: str) -> str:
+    # The database is shared by the whole session, so each test claims only its own jobs
+    return f"test_{name}_{next(_kinds)}"
+
+def failing_handler(kind: str, failures: int):
+    """Handler recording a side effect, then raising on its first failures calls."""
+    calls = []
+
+    async def handler(conn, payload):
+        calls.append(payload)
+        await conn.execute(insert(effects).values(kind=kind))
+        if len(calls) <= failures:
+            raise RuntimeError(f"failure {len(calls)}")
+
+    return handler, calls
+
+async def enqueue_job(kind: str):
+    async with SessionLocal() as session:
+        await enqueue(session, kind, {"n": 1})
+        await session.commit()
+
+async def outbox_rows(kind: str):
+    async with engine.connect() as conn:
+        result = await conn.execute(select(outbox).where(outbox.c.kind == kind))
+        return result.all()
+
+async def effect_count(kind: str) -> int:
+    async with engine.connect() as conn:
+        return (await conn.execute(select(func.count()).select_from(effects).where(effects.c.kind == kind))).scalar()
+
+async def test_failed_job_is_retried_and_applied_once(queue):
+    kind = unique_kind("retry")
+    handler, calls = failing_handler(kind, failures=1)
+    queue.handler(kind)(handler)
+    await enqueue_job(kind)
+
+    assert await queue.drain() == 2
+
+    assert len(calls) == 2
+    # The failed attempt's write rolled back with it
+    assert await effect_count(kind) == 1
+    assert await outbox_rows(kind) == []
+    assert await queue.drain() == 0
+
+async def test_job_is_dead_after_max_attempts(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_MAX_ATTEMPTS", 3)
+    kind = unique_kind("dead")
+    handler, calls = failing_handler(kind, failures=10)
+    queue.handler(kind)(handler)
+    await enqueue_job(kind)
+
+    assert await queue.drain() == 3
+
+    [row] = await outbox_rows(kind)
+    assert (row.status, row.attempts, row.locked_until) == ("dead", 3, None)
+    assert "failure 3" in row.last_error
+    assert await effect_count(kind) == 0
+    # Dead jobs are never claimed again
+    assert await queue.drain() == 0
+    assert len(calls) == 3
+
+async def test_claimed_job_is_leased_to_one_claimer(queue):
+    kind = unique_kind("lease")
+    handler, _ = failing_handler(kind, failures=0)
+    queue.handler(kind)(handler)
+    await enqueue_job(kind)
+
+    [job] = await queue.claim(5)
+    assert await queue.claim(5) == []
+
+    # Another claimer took the job over after the lease expired: completing it must not count
+    async with engine.begin() as conn:
+        await conn.execute(
+            update(outbox).where(outbox.c.id == job.id).values(locked_until=datetime.utcnow() + timedelta(minutes=5))
+        )
+    assert await queue.run(job) is False
+    assert await effect_count(kind) == 0
+    assert len(await outbox_rows(kind)) == 1
+
+async def test_workers_run_woken_jobs(queue):
+    kind = unique_kind("worker")
+    handler, _ = failing_handler(kind, failures=0)
+    queue.handler(kind)(handler)
+
+    await queue.start()
+    try:
+        # More jobs than workers
+        for _ in range(3):
+            await enqueue_job(kind)
+        queue.wake()
+        for _ in range(100):
+            if not await outbox_rows(kind):
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await queue.stop()
+
+    assert await outbox_rows(kind) == []
+    assert await effect_count(kind) == 3
+
+async def test_start_refuses_without_outbox_table(tmp_path):
+    empty = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'empty.db'}")
+    try:
+        with pytest.raises(RuntimeError, match="outbox table does not exist"):
+            await JobQueue(empty).start()
+    finally:
+        await empty.dispose()
+
+async def test_idle_queue_polls_once_per_interval(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_POLL_INTERVAL", 0.05)
+    limits = []
+    claim = queue.claim
+
+    async def counting_claim(limit):
+        limits.append(limit)
+        return await claim(limit)
+
+    queue.claim = counting_claim
+    await queue.start()
+    try:
+        await asyncio.sleep(0.22)
+    finally:
+        await queue.stop()
+
+    # One batch claim for all idle workers per interval, not one per worker
+    assert 3 <= len(limits) <= 6
+    assert set(limits) == {queue.workers}
@@ -0,0 +1,46 @@
+"""Per-route DB statement metrics, including statements run while a response streams."""
+import re
+import time
+
+import httpx
+import pytest
+from sqlalchemy import insert
+
+from app.db import engine
+from app.main import app
+from app.migrations import run_migrations
+from app.models import Listing, User
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def client():
+    await run_migrations(engine)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+async def statement_totals(client, route: str) -> tuple:
+    """(requests, statements) recorded so far for GET route, from /metrics."""
+    text = (await client.get("/metrics")).text
+    labels = re.escape(f'{{method="GET",route="{route}"}}')
+    count = re.search(rf"^http_request_db_statements_count{labels} (\S+)$", text, re.M)
+    total = re.search(rf"^http_request_db_statements_sum{labels} (\S+)$", text, re.M)
+    return (int(count.group(1)), float(total.group(1))) if count else (0, 0.0)
+
+async def test_statements_run_while_streaming_are_counted(client):
+    async with engine.begin() as conn:
+        owner_id = (await conn.execute(
+            insert(User).values(email=f"export-{time.time_ns()}@example.com", username="export", password_hash="x")
+            .returning(User.id)
+        )).scalar_one()
+        await conn.execute(insert(Listing).values(title="Rug", description="", category="home", price=9.0, owner_id=owner_id))
+    requests, statements = await statement_totals(client, "/listings/export")
+
+    response = await client.get("/listings/export")
+    assert response.status_code == 200
+    assert "Rug" in response.text
+
+    # The export opens its session only once the body starts streaming
+    after = await statement_totals(client, "/listings/export")
+    assert after[0] == requests + 1
+    assert after[1] >= statements + 1
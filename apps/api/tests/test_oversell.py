@@ -0,0 +1,100 @@
+"""Concurrent buyers of one listing: exactly one hold, claim or legacy order wins."""
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import insert, select
+
+import main as legacy
+from app.db import SessionLocal, engine
+from app.migrations import run_migrations
+from app.models import Listing, User
+from app.reservations import claim_listings, hold_listings
+
+pytestmark = pytest.mark.anyio
+
+BUYERS = 20
+
+@pytest.fixture(autouse=True)
+async def fresh_pool():
+    # More sessions than pooled connections make the pool wait on a queue bound to this test's loop
+    yield
+    await engine.dispose()
+
+async def create_buyers_and_listing() -> tuple:
+    """Insert a seller, BUYERS buyers and one available listing; returns (buyer ids, listing id)."""
+    await run_migrations(engine)
+    run = time.time_ns()
+    async with engine.begin() as conn:
+        seller_id, *buyer_ids = (await conn.execute(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [
+                {"email": f"race-{run}-{i}@example.com", "username": f"race{i}", "password_hash": "x"}
+                for i in range(BUYERS + 1)
+            ]
+        )).scalars().all()
+        listing_id = (await conn.execute(
+            insert(Listing).values(title="Armchair", description="", category="home", price=80.0, owner_id=seller_id)
+            .returning(Listing.id)
+        )).scalar_one()
+    return buyer_ids, listing_id
+
+async def attempt(action, buyer_id: int, listing_id: int) -> bool:
+    """Run one hold or claim in its own transaction; returns whether it got the listing."""
+    async with SessionLocal() as session:
+        won = bool(await action(session, buyer_id, [listing_id]))
+        await session.commit()
+        return won
+
+async def listing_state(listing_id: int):
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            select(Listing.is_available, Listing.reserved_by).where(Listing.id == listing_id)
+        )
+        return result.one()
+
+async def test_concurrent_claims_sell_the_listing_once():
+    buyer_ids, listing_id = await create_buyers_and_listing()
+
+    results = await asyncio.gather(*(attempt(claim_listings, buyer_id, listing_id) for buyer_id in buyer_ids))
+
+    assert results.count(True) == 1
+    assert await listing_state(listing_id) == (False, None)
+
+async def test_concurrent_holds_and_claims_have_one_winner():
+    buyer_ids, listing_id = await create_buyers_and_listing()
+    actions = [hold_listings, claim_listings] * (BUYERS // 2)
+
+    results = await asyncio.gather(*(
+        attempt(action, buyer_id, listing_id) for action, buyer_id in zip(actions, buyer_ids)
+    ))
+
+    [winner] = [(action, buyer_id) for action, buyer_id, won in zip(actions, buyer_ids, results) if won]
+    if winner[0] is hold_listings:
+        assert await listing_state(listing_id) == (True, winner[1])
+        # Nobody else can buy it while the hold lasts, but the holder can
+        assert not await attempt(claim_listings, next(other for other in buyer_ids if other != winner[1]), listing_id)
+        assert await attempt(claim_listings, winner[1], listing_id)
+    else:
+        assert await listing_state(listing_id) == (False, None)
+
+async def test_concurrent_legacy_orders_sell_the_listing_once(legacy_client):
+    client, sessions = legacy_client
+    async with sessions() as session:
+        session.add_all([
+            legacy.User(email="seller@example.com", full_name="Seller", hashed_password="x"),
+            legacy.User(email="buyer@example.com", full_name="Buyer", hashed_password="x"),
+        ])
+        await session.flush()
+        listing = legacy.Listing(title="Armchair", description="", category="home", price=80.0, seller_id=1)
+        session.add(listing)
+        await session.commit()
+
+    order = {"items": [{"id": listing.id, "price": 80.0, "quantity": 1}], "shipping_address": "1 Main St"}
+    responses = await asyncio.gather(*(client.post("/orders", json=order) for _ in range(BUYERS)))
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200] + [409] * (BUYERS - 1)
+    async with sessions() as session:
+        assert (await session.get(legacy.Listing, listing.id)).is_available is False
+        assert len((await session.execute(select(legacy.OrderItem))).scalars().all()) == 1
@@ -0,0 +1,76 @@
+"""Order history endpoints run a fixed number of statements per page."""
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import event, insert
+
+from app.auth import create_access_token
+from app.db import engine
+from app.main import app
+from app.migrations import run_migrations
+from app.models import Listing, Order, OrderItem, User
+
+pytestmark = pytest.mark.anyio
+
+ITEMS_PER_ORDER = 3
+# Principal lookup, the page of orders, and all of their items in one IN query
+STATEMENTS_PER_PAGE = 3
+
+async def create_user_with_orders(orders: int) -> str:
+    """Insert a user with orders (each with items); returns a bearer token for them."""
+    run = time.time_ns()
+    now = datetime.utcnow()
+    async with engine.begin() as conn:
+        user_id = (await conn.execute(
+            insert(User).values(email=f"history-{run}@example.com", username="history", password_hash="x")
+            .returning(User.id)
+        )).scalar_one()
+        listing_id = (await conn.execute(
+            insert(Listing).values(title="Teapot", description="", category="home", price=10.0, owner_id=user_id)
+            .returning(Listing.id)
+        )).scalar_one()
+        order_ids = (await conn.execute(
+            insert(Order).returning(Order.id, sort_by_parameter_order=True),
+            [{"user_id": user_id, "total": 30.0, "created_at": now - timedelta(minutes=n)} for n in range(orders)]
+        )).scalars().all()
+        await conn.execute(insert(OrderItem), [
+            {"order_id": order_id, "listing_id": listing_id, "title_snapshot": "Teapot", "price_snapshot": 10.0, "qty": 1}
+            for order_id in order_ids for _ in range(ITEMS_PER_ORDER)
+        ])
+
+    return create_access_token({"sub": str(user_id), "username": "history", "ver": 0})
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+@pytest.fixture
+async def client():
+    await run_migrations(engine)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+@pytest.mark.parametrize("path", ["/orders/mine", "/transactions"])
+async def test_history_statement_count_is_independent_of_order_count(client, path):
+    counts = {}
+    for orders in (2, 60):
+        token = await create_user_with_orders(orders)
+        with count_statements() as statements:
+            response = await client.get(path, params={"limit": 50}, headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert len(response.json()["items"]) == min(orders, 50)
+        counts[orders] = len(statements)
+
+    assert counts == {2: STATEMENTS_PER_PAGE, 60: STATEMENTS_PER_PAGE}, f"{path}: {counts}"
@@ -0,0 +1,93 @@
+"""Read routing with a replica: reads go to it, except after the client's own writes."""
+import time
+
+import httpx
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.auth import create_access_token
+from app.db import engine
+from app.main import app
+from app.migrations import run_migrations
+from app.models import Listing, Order, User
+from app.replicas import READ_YOUR_WRITES_COOKIE, Replica, _signature, replica_router
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def replica(tmp_path, monkeypatch):
+    """A healthy replica on its own SQLite file, with the schema but none of the primary's rows."""
+    replica_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    await run_migrations(replica_engine)
+    replica = Replica(replica_engine)
+    await replica.check()
+    monkeypatch.setattr(replica_router, "replicas", [replica])
+    try:
+        yield replica
+    finally:
+        await replica_engine.dispose()
+
+@pytest.fixture
+async def client():
+    await run_migrations(engine)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+async def create_user_with_order() -> tuple:
+    """Insert a user with one order and a listing on the primary; returns (bearer headers, listing id)."""
+    run = time.time_ns()
+    async with engine.begin() as conn:
+        user_id = (await conn.execute(
+            insert(User).values(email=f"replica-{run}@example.com", username="replica", password_hash="x")
+            .returning(User.id)
+        )).scalar_one()
+        await conn.execute(insert(Order).values(user_id=user_id, total=5.0))
+        listing_id = (await conn.execute(
+            insert(Listing).values(title="Vase", description="", category="home", price=5.0, owner_id=user_id)
+            .returning(Listing.id)
+        )).scalar_one()
+
+    token = create_access_token({"sub": str(user_id), "username": "replica", "ver": 0})
+    return {"Authorization": f"Bearer {token}"}, listing_id
+
+async def order_count(client, headers, cookie=None) -> int:
+    """Number of orders GET /orders/mine returns, sending only the given read-your-writes cookie."""
+    client.cookies.clear()
+    if cookie is not None:
+        client.cookies.set(READ_YOUR_WRITES_COOKIE, cookie)
+    response = await client.get("/orders/mine", headers=headers)
+    assert response.status_code == 200
+    return len(response.json()["items"])
+
+async def test_reads_go_to_the_replica(client, replica):
+    headers, _ = await create_user_with_order()
+
+    # The order exists only on the primary
+    assert await order_count(client, headers) == 0
+
+    replica.healthy = False
+    assert await order_count(client, headers) == 1
+
+async def test_reads_go_to_the_primary_after_a_write(client, replica):
+    headers, listing_id = await create_user_with_order()
+
+    response = await client.post("/cart/items", json={"listing_id": listing_id}, headers=headers)
+    assert response.status_code == 200
+    cookie = response.cookies[READ_YOUR_WRITES_COOKIE]
+
+    assert await order_count(client, headers, cookie) == 1
+
+async def test_expired_or_tampered_cookies_are_ignored(client, replica):
+    headers, listing_id = await create_user_with_order()
+    response = await client.post("/cart/items", json={"listing_id": listing_id}, headers=headers)
+    until, _, signature = response.cookies[READ_YOUR_WRITES_COOKIE].partition(":")
+
+    forged = f"{float(until) + 3600:.3f}:{signature}"
+    assert await order_count(client, headers, forged) == 0
+    assert await order_count(client, headers, f"{until}:{'0' * 64}") == 0
+    assert await order_count(client, headers, "garbage") == 0
+
+    # A correctly signed deadline in the past no longer pins reads
+    past = f"{time.time() - 1:.3f}"
+    assert await order_count(client, headers, f"{past}:{_signature(past)}") == 0
@@ -0,0 +1,129 @@
+"""ResponseCache over a Redis-like client: hits, invalidation, outages and single-flight loads."""
+import asyncio
+
+import pytest
+
+from app.response_cache import RedisBackend, ResponseCache
+
+pytestmark = pytest.mark.anyio
+
+class FakeRedis:
+    """The redis.asyncio calls RedisBackend makes, on a dict (expiry is recorded, not applied)."""
+
+    def __init__(self):
+        self.values = {}
+        self.expiry = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("redis is down")
+
+    async def get(self, key):
+        self._check()
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self._check()
+        self.values[key] = value
+        self.expiry[key] = ex
+
+    async def incr(self, key):
+        self._check()
+        self.values[key] = str(int(self.values.get(key, 0)) + 1).encode()
+        return int(self.values[key])
+
+class CountingLoader:
+    """Loader returning {"n": calls so far}, optionally blocking until released."""
+
+    def __init__(self, gated: bool = False):
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        if not gated:
+            self.release.set()
+
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        await self.release.wait()
+        return {"n": self.calls}
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+@pytest.fixture
+def cache(redis):
+    return ResponseCache(RedisBackend(redis), ttl=30)
+
+async def test_hits_are_served_from_redis_until_invalidated(cache, redis):
+    loader = CountingLoader()
+
+    first = await cache.get_or_load("listings", {"q": "lamp", "cursor": None}, loader)
+    second = await cache.get_or_load("listings", {"q": "lamp"}, loader)
+
+    assert loader.calls == 1
+    assert second.body == first.body
+    assert redis.expiry == {"listings:0:q=lamp": 30}
+
+    await cache.invalidate("listings")
+    third = await cache.get_or_load("listings", {"q": "lamp"}, loader)
+
+    assert loader.calls == 2
+    assert third.body != first.body
+    assert "listings:1:q=lamp" in redis.values
+
+async def test_redis_outage_falls_back_to_the_loader(cache, redis):
+    redis.down = True
+    loader = CountingLoader()
+
+    responses = [await cache.get_or_load("listings", {}, loader) for _ in range(2)]
+    await cache.invalidate("listings")
+
+    assert loader.calls == 2
+    assert [response.body for response in responses] == [b'{"n":1}', b'{"n":2}']
+
+async def test_concurrent_misses_share_one_load(cache):
+    loader = CountingLoader(gated=True)
+
+    requests = [asyncio.create_task(cache.get_or_load("listings", {"page": 1}, loader)) for _ in range(5)]
+    await loader.started.wait()
+    await asyncio.sleep(0)
+    loader.release.set()
+    responses = await asyncio.gather(*requests)
+
+    assert loader.calls == 1
+    assert {response.body for response in responses} == {b'{"n":1}'}
+
+async def test_waiters_take_over_when_the_loading_request_is_cancelled(cache):
+    loader = CountingLoader(gated=True)
+
+    loading = asyncio.create_task(cache.get_or_load("listings", {"page": 2}, loader))
+    await loader.started.wait()
+    waiters = [asyncio.create_task(cache.get_or_load("listings", {"page": 2}, loader)) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    loading.cancel()
+    loader.release.set()
+    responses = await asyncio.gather(*waiters)
+
+    assert loading.cancelled()
+    # One waiter loaded again and the others shared its result
+    assert loader.calls == 2
+    assert {response.body for response in responses} == {b'{"n":2}'}
+
+async def test_cancelled_waiter_does_not_cancel_the_load(cache):
+    loader = CountingLoader(gated=True)
+
+    loading = asyncio.create_task(cache.get_or_load("listings", {"page": 3}, loader))
+    await loader.started.wait()
+    waiter = asyncio.create_task(cache.get_or_load("listings", {"page": 3}, loader))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    loader.release.set()
+
+    assert (await loading).body == b'{"n":1}'
+    assert waiter.cancelled()
+    assert loader.calls == 1